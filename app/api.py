@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Headless JSON API over the same data and caches as the Gradio app (no UI rendering).
+
+    GET /actions?scope=today|all&k=3&lang=ja        top-k events by priority
+    GET /pack/{event_id}?lang=ja&evidence=true       pack as data (email, chat, checklist, risks, ICS text)
+    GET /pack/{event_id}/ics                         the pack's calendar entry (text/calendar)
+    GET /kpi?range=30|month|all&property=P001        totals, rates, calm levels, baseline alerts
+    GET /kpi/properties?range=30                     totals and rates per property
+    GET /evidence?q=...&k=3&category=Offer&lang=en   ranked evidence chunks
+
+Standalone:        python app/api.py --port 8000          (or: uvicorn api:api --app-dir app)
+With the UI:       python app/api.py --ui                 (Gradio mounted at /ui, API at /)
+In another app:    app.mount("/pmo", api.api)
+Interactive docs at /docs. Handlers are plain functions, so FastAPI runs them in its thread pool.
+"""
+import datetime as dt, json
+from typing import Literal, Optional
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import Response
+import pmo_core as pmo
+from evidence_index import BACKENDS, get_index, search_cached
+from kpi_rollup import METRICS, RATES, property_summary
+from locale_bundles import LANG_CODES, english_text
+
+LANGS = {code: name for name, code in LANG_CODES.items()}          # "ja" -> "日本語"
+SCOPES = {"today": pmo.CHOICES_ACTION[0], "all": pmo.CHOICES_ACTION[1]}
+RANGES = {"30": pmo.CHOICES_KPI[0], "month": pmo.CHOICES_KPI[1], "all": pmo.CHOICES_KPI[2]}
+Lang = Literal["ja", "en"]
+Scope = Literal["today", "all"]
+Range = Literal["30", "month", "all"]
+Backend = Literal[tuple(BACKENDS)]
+ACTION_FIELDS = ["event_id", "actor", "category", "risk_level", "description", "expected_action", "success_criteria"]
+
+api = FastAPI(title="AI Real Estate PMO API", version="1.0",
+              description="Top actions, packs, KPI aggregates and evidence search as JSON.")
+
+def _date(x):
+    return None if x is None or pd.isna(x) else pd.Timestamp(x).date().isoformat()
+
+def _action(row, lang):
+    out = {f: str(row[f]) for f in ACTION_FIELDS}
+    if lang == "English":
+        for c in pmo.EN_COLS:
+            out[c] = pmo.row_en(row, c)
+    out["date"] = _date(row["date_dt"])
+    out["priority"] = int(row["priority"])
+    return out
+
+def _event_row(event_id):
+    df = pmo.load_events()
+    hit = df[df["event_id"].astype(str) == str(event_id)]
+    if hit.empty:
+        raise HTTPException(404, f"unknown event_id: {event_id}")
+    return hit.iloc[0]
+
+def _evidence(tokens, route, k, backend, lang):
+    """Ranked chunks; `text` in the requested language.
+
+    en: the indexed English rendering when it is fully English (`translated`: true), else
+    the Japanese original (`translated`: false); the original is always under `text_ja`.
+    """
+    index = get_index()
+    if index is None or not index.size or not tokens:
+        return []
+    top = search_cached(index, [tokens], [route], k, backend)[0]
+    out = []
+    for s, c in top:
+        r = {"score": round(float(s), 6), **{f: c.get(f) for f in ("id", "tag", "source", "page")}, "text": c.get("text")}
+        if lang == "English":
+            (r["text"], r["translated"]), r["text_ja"] = english_text(c.get("text"), c.get("text_en")), c.get("text")
+        out.append(r)
+    return out
+
+def _kpi_rollup(prop):
+    df, err = pmo.read_kpi()
+    if df is None:
+        raise HTTPException(404, err)
+    rollup = pmo.KPI_STORE.rollup_for(prop)
+    if rollup is None:
+        raise HTTPException(404, f"no KPI rows for property: {prop}")
+    return df, rollup
+
+def _bounds(range_, start, end):
+    if start or end:
+        if start and end and start > end:
+            raise HTTPException(422, "start must not be after end")
+        return pmo.kpi_range_bounds((start, end))
+    return pmo.kpi_range_bounds(RANGES[range_])
+
+# ===================== Endpoints =====================
+@api.get("/actions")
+def actions(scope: Scope = "today", k: int = Query(3, ge=1, le=100), lang: Lang = "ja"):
+    """Top-k in-scope events by priority (same ranking as the Action tab)."""
+    name = LANGS[lang]
+    top = pmo.rank_actions(pmo.load_events(), SCOPES[scope]).head(k)
+    return {"scope": scope, "lang": lang, "actions": [_action(r, name) for _, r in top.iterrows()]}
+
+@api.get("/pack/{event_id}")
+def pack(event_id: str, lang: Lang = "ja", evidence: bool = False, k: int = Query(3, ge=1, le=20)):
+    """Pack contents as data; `ics` is the calendar entry text. Nothing is posted to chat or written to disk."""
+    name = LANGS[lang]
+    row = _event_row(event_id)
+    out = pmo.pack_parts(row, name)
+    if evidence:
+        index = get_index()
+        tokens = index.tokenize(pmo.support_query(row, name)) if index is not None else []
+        out["evidence"] = _evidence(tokens, pmo.support_route(row), k, pmo.EVIDENCE_BACKEND, name)
+    return out
+
+@api.get("/pack/{event_id}/ics")
+def pack_ics(event_id: str, lang: Lang = "ja"):
+    ics = pmo.pack_parts(_event_row(event_id), LANGS[lang])["ics"]
+    return Response(ics.encode("utf-8"), media_type="text/calendar; charset=utf-8",
+                    headers={"Content-Disposition": f'attachment; filename="{event_id}.ics"'})
+
+@api.get("/kpi")
+def kpi(range_: Range = Query("all", alias="range"), start: Optional[dt.date] = None, end: Optional[dt.date] = None,
+        property_: Optional[str] = Query(None, alias="property")):
+    """Totals, rates, calm levels and baseline alerts for one property (all rows when omitted)."""
+    _, rollup = _kpi_rollup(property_)
+    lo, hi = _bounds(range_, start, end)
+    tot = rollup.totals(lo, hi)
+    alerts = pmo.KPI_ALERTS.update(property_, pmo.KPI_TRENDS.get(rollup, property_))
+    rates = {k: (tot[num] / tot[den] if tot[den] > 0 else None) for k, (num, den) in RATES.items()}
+    return {"property": property_, "start": _date(lo), "end": _date(hi),
+            "first": _date(tot["first"]), "last": _date(tot["last"]),
+            "totals": {m: int(tot[m]) for m in METRICS}, "rates": rates,
+            "levels": {k: pmo.calm_level(v, k, alerts.get(k)) for k, v in rates.items()},
+            "alerts": alerts}
+
+@api.get("/kpi/properties")
+def kpi_properties(range_: Range = Query("all", alias="range"), start: Optional[dt.date] = None,
+                   end: Optional[dt.date] = None):
+    """Totals and rates per property over the range (one groupby)."""
+    df, _ = _kpi_rollup(None)
+    lo, hi = _bounds(range_, start, end)
+    a = df["date"].searchsorted(lo, side="left") if lo is not None else 0
+    b = df["date"].searchsorted(hi, side="right") if hi is not None else len(df)
+    summ = property_summary(df.iloc[a:b])
+    return {"start": _date(lo), "end": _date(hi), "properties": json.loads(summ.to_json(orient="records"))}
+
+@api.get("/evidence")
+def evidence(q: str, k: int = Query(3, ge=1, le=50), category: str = None, lang: Lang = "ja",
+             backend: Backend = pmo.EVIDENCE_BACKEND):
+    """Ranked chunks for free text (Japanese or English); `category` searches its routed tags first, as the pack does."""
+    index = get_index()
+    tokens = index.tokenize(q) if index is not None else []
+    route = pmo.EVIDENCE_ROUTES.get(category) if category else None
+    return {"query": q, "category": category, "backend": backend, "lang": lang,
+            "results": _evidence(tokens, route, k, backend, LANGS[lang])}
+
+def create_app(ui=False, ui_path="/ui"):
+    """`api`, optionally with the Gradio UI mounted at `ui_path` (one process, shared caches)."""
+    if ui:
+        import gradio as gr
+        import app as ui_app           # builds the Blocks UI; only imported when mounting it
+        return gr.mount_gradio_app(api, ui_app.demo, path=ui_path)
+    return api
+
+if __name__ == "__main__":
+    import argparse, uvicorn
+    ap = argparse.ArgumentParser(description="Serve the PMO JSON API (optionally with the Gradio UI)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--ui", action="store_true", help="also mount the Gradio UI at /ui")
+    a = ap.parse_args()
+    uvicorn.run(create_app(a.ui), host=a.host, port=a.port)
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""Chat webhook dispatcher for pack snippets (batched / rate-limited / retry queue).
+
+Runs its own asyncio loop in a daemon thread so Gradio handlers only enqueue.
+Configure with PMO_CHAT_WEBHOOK_URL (and optionally PMO_CHAT_CHANNEL).
+Local stub for testing:  python app/chat_dispatch.py --stub 8765
+"""
+import asyncio, json, os, threading, time
+import urllib.request, urllib.error
+from pathlib import Path
+
+WEBHOOK_ENV = "PMO_CHAT_WEBHOOK_URL"
+CHANNEL_ENV = "PMO_CHAT_CHANNEL"
+DEFAULT_CHANNEL = "#pmo"
+QUEUE_PATH = Path(__file__).resolve().parents[1] / "data" / "chat_retry_queue.jsonl"
+
+# ===================== Rate limit =====================
+class TokenBucket:
+    """`rate` tokens per second, up to `burst` at once."""
+    def __init__(self, rate=1.0, burst=3):
+        self.rate = float(rate); self.burst = float(burst)
+        self.tokens = float(burst); self.stamp = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        return now
+
+    def pause(self, seconds):
+        """Honour a server-side Retry-After: no tokens until it has passed."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    async def acquire(self):
+        while True:
+            now = self._refill()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now); continue
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# ===================== Dispatcher =====================
+class ChatDispatcher:
+    def __init__(self, url, rate=1.0, burst=3, batch_window=2.0, max_lines=20,
+                 queue_path=QUEUE_PATH, timeout=5.0, retry_interval=30.0, max_attempts=8):
+        self.url = url
+        self.bucket = TokenBucket(rate, burst)
+        self.batch_window = batch_window; self.max_lines = max_lines
+        self.queue_path = Path(queue_path); self.timeout = timeout
+        self.retry_interval = retry_interval; self.max_attempts = max_attempts
+        self.stats = {"submitted": 0, "coalesced": 0, "sent": 0, "failed": 0, "dropped": 0}
+        self._pending = {}   # channel -> {text: count}  (insertion ordered)
+        self._timers = {}
+        self._inflight = []  # items being sent; saved until sent, dropped or re-queued
+        self._retry = self._load_queue()
+        self._loop = None; self._thread = None
+        self._ready = threading.Event()
+
+    # ---- lifecycle ----
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="chat-dispatch", daemon=True)
+        self._thread.start(); self._ready.wait()
+        return self
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.create_task(self._retry_loop())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def stop(self, timeout=10.0):
+        """Flush pending batches, then stop the loop (unsent items stay in the retry queue)."""
+        if self._loop is None:
+            return
+        fut = asyncio.run_coroutine_threadsafe(self._flush_all(), self._loop)
+        try:
+            fut.result(timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None; self._loop = None
+
+    # ---- public (thread-safe) ----
+    def submit(self, channel, text):
+        text = str(text).strip()
+        if not text:
+            return
+        if self._loop is None:
+            self.start()
+        self._loop.call_soon_threadsafe(self._enqueue, channel or DEFAULT_CHANNEL, text)
+
+    # ---- batching ----
+    def _enqueue(self, channel, text):
+        self.stats["submitted"] += 1
+        batch = self._pending.setdefault(channel, {})
+        if text in batch:
+            self.stats["coalesced"] += 1
+        batch[text] = batch.get(text, 0) + 1
+        self._save_queue()
+        if channel not in self._timers:
+            self._timers[channel] = self._loop.call_later(
+                self.batch_window, lambda: self._loop.create_task(self._flush(channel)))
+
+    def _payloads(self, channel, batch):
+        lines = [t if n == 1 else f"{t} (×{n})" for t, n in batch.items()]
+        return [{"channel": channel, "text": "\n".join(lines[i:i+self.max_lines])}
+                for i in range(0, len(lines), self.max_lines)]
+
+    async def _flush(self, channel):
+        self._timers.pop(channel, None)
+        items = [{"payload": p, "attempts": 0, "next_at": 0}
+                 for p in self._payloads(channel, self._pending.pop(channel, {}))]
+        self._inflight += items
+        for item in items:
+            await self._send(item)
+
+    async def _flush_all(self):
+        for channel in list(self._pending):
+            timer = self._timers.pop(channel, None)
+            if timer: timer.cancel()
+            await self._flush(channel)
+
+    # ---- delivery ----
+    def _post(self, payload):
+        req = urllib.request.Request(self.url, data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=self.timeout) as res:
+            return res.status
+
+    async def _send(self, item):
+        """Post one in-flight item; it leaves the saved queue only once sent, dropped or re-queued."""
+        await self.bucket.acquire()
+        try:
+            await self._loop.run_in_executor(None, self._post, item["payload"])
+            self.stats["sent"] += 1
+            return True
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                try:
+                    self.bucket.pause(float(e.headers.get("Retry-After", "1")))
+                except ValueError:
+                    self.bucket.pause(1.0)
+            elif 400 <= e.code < 500:
+                self.stats["dropped"] += 1   # malformed / forbidden: retrying will not help
+                return False
+            self._push_retry(item)
+        except Exception:
+            self._push_retry(item)
+        finally:
+            self._inflight.remove(item)
+            self._save_queue()
+        return False
+
+    # ---- persistent retry queue ----
+    # One JSON per line: retry items {"payload", "attempts", "next_at"} (in-flight ones included, due
+    # at once) and unflushed batches {"channel", "batch"}, so a crash loses neither.
+    def _load_queue(self):
+        items = []
+        if self.queue_path.exists():
+            for line in self.queue_path.read_text(encoding="utf-8").splitlines():
+                try:
+                    item = json.loads(line)
+                except Exception:
+                    continue
+                if "batch" in item:
+                    items += [{"payload": p, "attempts": 0, "next_at": 0} for p in self._payloads(item["channel"], item["batch"])]
+                else:
+                    items.append(item)
+        return items
+
+    def _save_queue(self):
+        items = self._retry + self._inflight + [{"channel": c, "batch": b} for c, b in self._pending.items()]
+        self.queue_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.queue_path.with_suffix(".tmp")
+        tmp.write_text("".join(json.dumps(i, ensure_ascii=False) + "\n" for i in items), encoding="utf-8")
+        os.replace(tmp, self.queue_path)
+
+    def _push_retry(self, item):
+        """Re-queue a failed item with exponential backoff (saved by the caller)."""
+        self.stats["failed"] += 1
+        attempts = item["attempts"] + 1
+        if attempts >= self.max_attempts:
+            self.stats["dropped"] += 1
+        else:
+            delay = min(self.retry_interval * (2 ** (attempts - 1)), 3600)
+            self._retry.append({"payload": item["payload"], "attempts": attempts, "next_at": time.time() + delay})
+
+    async def _retry_loop(self):
+        while True:
+            now = time.time()
+            due = [i for i in self._retry if i["next_at"] <= now]
+            if due:
+                self._retry = [i for i in self._retry if i["next_at"] > now]
+                self._inflight += due          # still saved until each one is settled
+                for item in due:
+                    await self._send(item)
+            await asyncio.sleep(min(self.retry_interval, 5.0))
+
+# ===================== Module-level access =====================
+_dispatcher = None
+_lock = threading.Lock()
+
+def get_dispatcher():
+    """Shared dispatcher, or None when no webhook URL is configured."""
+    global _dispatcher
+    url = os.environ.get(WEBHOOK_ENV, "").strip()
+    if not url:
+        return None
+    with _lock:
+        if _dispatcher is not None and _dispatcher.url != url:
+            _dispatcher.stop()       # flush + stop its thread first: one writer per queue file
+            _dispatcher = None
+        if _dispatcher is None:
+            _dispatcher = ChatDispatcher(url).start()
+    return _dispatcher
+
+def post_snippet(text, channel=None):
+    """Queue a chat snippet; no-op if the webhook is not configured."""
+    d = get_dispatcher()
+    if d is None:
+        return False
+    d.submit(channel or os.environ.get(CHANNEL_ENV, DEFAULT_CHANNEL), text)
+    return True
+
+# ===================== Local stub =====================
+def run_stub(port=8765, status=200):
+    """Minimal webhook receiver that prints each payload (status can be forced, e.g. 429/500)."""
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            print(time.strftime("%H:%M:%S"), body.decode("utf-8", "replace"), flush=True)
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", "5")
+            self.end_headers(); self.wfile.write(b"ok")
+        def log_message(self, *_):
+            pass
+
+    print(f"Chat webhook stub on http://127.0.0.1:{port}/ (status {status})")
+    HTTPServer(("127.0.0.1", port), Handler).serve_forever()
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Chat webhook stub for local testing")
+    ap.add_argument("--stub", type=int, metavar="PORT", default=8765)
+    ap.add_argument("--status", type=int, default=200)
+    a = ap.parse_args()
+    run_stub(a.stub, a.status)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""Evidence retrieval benchmark: relevance and latency of the index scorers.
+
+Seeds are the existing chunks (data/rag_chunks_sample.jsonl) plus template sentences
+built from the checklist and risk items of each stage (locales/ja.json), tagged by the
+stage's evidence route. The corpus expands them synthetically: each variant keeps some
+clauses of one seed (its family) and pads with clauses of other seeds, so documents vary
+in length and share common clauses. Queries are fragments of two clauses of one seed
+plus one clause of another, not aligned to punctuation, so they exercise the analyzer
+(whole runs vs n-grams) as well as the scorer.
+
+Labels: the chunks of the query's seed family are relevant. R@k = relevant chunks in the
+top k / min(k, family size); MRR = first relevant rank; tagP@k = share of top k with the
+seed's tag. "routed" searches the stage's route tags first, as retrieve_support does.
+
+    python app/evidence_bench.py --docs 5000 --queries 300 --k 3
+"""
+import json, random, re, statistics, tempfile, time
+from collections import Counter
+from pathlib import Path
+from evidence_index import ANALYZER, DEFAULT_ROUTES, EvidenceIndex
+from locale_bundles import bundle
+
+ROOT = Path(__file__).resolve().parents[1]
+SAMPLE = ROOT / "data" / "rag_chunks_sample.jsonl"
+SCORERS = {"overlap": lambda idx, q, k, tags: idx.search_overlap(q, k),
+           "bm25": lambda idx, q, k, tags: idx.search(q, k),
+           "tfidf": lambda idx, q, k, tags: idx.search_batch([q], k, "tfidf")[0],
+           "routed": lambda idx, q, k, tags: idx.query(q, k, "bm25", tags)}
+BATCH_BACKENDS = ("bm25", "tfidf")
+ANALYZERS = {"words": {**ANALYZER, "ngrams": ()}, "ngram": ANALYZER}
+TEMPLATES = ["{item}を{when}までに確定する", "{item}が遅れると{risk}につながる",
+             "{when}に{item}を担当者と確認する", "{risk}を防ぐため{item}を先に進める"]
+WHEN = ["初動3日", "内覧前日", "申込前", "決済1週間前", "引渡前"]
+SEED_SOURCES = ("chunks", "templates")
+
+def clauses(text):
+    return [c for c in re.split(r"[。、．，]", text) if c.strip()]
+
+def load_seeds(path=SAMPLE):
+    with Path(path).open(encoding="utf-8") as f:
+        return [json.loads(l) for l in f if l.strip()]
+
+def template_seeds(rng, routes=DEFAULT_ROUTES, lang="ja"):
+    """One seed per checklist item of each stage: 2-3 template sentences mixing it with the stage's risks."""
+    b = bundle(lang)
+    out = []
+    for cat, items in b["checklists"].items():
+        risks = b["risks"].get(cat) or b["risks_default"]
+        tag = (routes.get(cat) or ["general"])[0]
+        for i, item in enumerate(items):
+            item = re.sub(r"[（(].*?[）)]", "", item).strip()
+            sents = [t.format(item=item, risk=rng.choice(risks), when=rng.choice(WHEN))
+                     for t in rng.sample(TEMPLATES, rng.randint(2, 3))]
+            out.append({"id": f"T-{cat}-{i}", "tag": tag, "text": "。".join(sents) + "。",
+                        "source": "template", "page": "", "category": cat})
+    return out
+
+def load_all_seeds(sample, sources, rng, routes=DEFAULT_ROUTES):
+    seeds = []
+    if "chunks" in sources:
+        by_tag = {t: c for c, ts in routes.items() for t in ts[:1]}
+        seeds += [{**s, "category": by_tag.get(s.get("tag"), "")} for s in load_seeds(sample)]
+    if "templates" in sources:
+        seeds += template_seeds(rng, routes)
+    return seeds
+
+def expand_corpus(seeds, n, rng):
+    out = []
+    for i in range(n):
+        s = rng.choice(seeds)
+        own = clauses(s["text"])
+        keep = rng.sample(own, rng.randint(1, len(own)))
+        noise = [rng.choice(clauses(rng.choice(seeds)["text"])) for _ in range(rng.randint(0, 6))]
+        parts = keep + noise; rng.shuffle(parts)
+        out.append({"id": f"{s['id']}-{i}", "tag": s["tag"], "text": "。".join(parts) + "。",
+                    "source": s.get("source", "note"), "page": s.get("page", ""), "family": s["id"]})
+    return out
+
+def fragment(clause, rng, min_len=4):
+    if len(clause) <= min_len:
+        return clause
+    n = rng.randint(min_len, len(clause))
+    i = rng.randint(0, len(clause) - n)
+    return clause[i:i+n]
+
+def make_queries(seeds, n, rng):
+    """(query, tag, family, category) per query; the family's chunks are the relevant set."""
+    qs = []
+    for _ in range(n):
+        s, other = rng.sample(seeds, 2) if len(seeds) > 1 else (seeds[0], seeds[0])
+        own = clauses(s["text"])
+        q = [fragment(c, rng) for c in rng.sample(own, min(2, len(own)))] + [rng.choice(clauses(other["text"]))]
+        qs.append((" ".join(q), s["tag"], s["id"], s.get("category", "")))
+    return qs
+
+def relevance(queries, tops, k, family_size):
+    rec, rr, prec = [], [], []
+    for (_, tag, fam, _), top in zip(queries, tops):
+        rel = [c.get("family") == fam for _, c in top]
+        rec.append(sum(rel) / max(min(k, family_size.get(fam, 0)), 1))
+        rr.append(next((1 / (i + 1) for i, h in enumerate(rel) if h), 0.0))
+        prec.append(sum(c.get("tag") == tag for _, c in top) / k)
+    return {"R@k": statistics.mean(rec), "MRR": statistics.mean(rr), "tagP@k": statistics.mean(prec)}
+
+def evaluate(index, queries, k, search, family_size, routes=DEFAULT_ROUTES):
+    tops, lat = [], []
+    search(index, [], k, None)                          # lazy posting weights outside the timing
+    for q, _, _, cat in queries:
+        toks, tags = index.tokenize(q), routes.get(cat)
+        t0 = time.perf_counter()
+        tops.append(search(index, toks, k, tags))
+        lat.append((time.perf_counter() - t0) * 1000)
+    lat.sort()
+    return {**relevance(queries, tops, k, family_size),
+            "p50_ms": lat[len(lat) // 2], "p99_ms": lat[min(len(lat) - 1, int(len(lat) * 0.99))]}
+
+def evaluate_batch(index, queries, k, backend, family_size):
+    """One search_batch call for all queries; latency columns are the amortized per-query time."""
+    index.search_batch([], k, backend)                 # build posting weights outside the timing
+    toks = [index.tokenize(q[0]) for q in queries]
+    t0 = time.perf_counter()
+    tops = index.search_batch(toks, k, backend)
+    per_q = (time.perf_counter() - t0) * 1000 / max(len(queries), 1)
+    return {**relevance(queries, tops, k, family_size), "p50_ms": per_q, "p99_ms": per_q}
+
+def run(docs=5000, queries=300, k=3, seed=7, sample=SAMPLE, sources=SEED_SOURCES):
+    rng = random.Random(seed)
+    seeds = load_all_seeds(sample, sources, rng)
+    corpus = expand_corpus(seeds, docs, rng)
+    family_size = Counter(c["family"] for c in corpus)
+    qs = make_queries(seeds, queries, rng)
+    with tempfile.TemporaryDirectory() as d:
+        src = Path(d) / "bench_chunks.jsonl"
+        src.write_text("".join(json.dumps(c, ensure_ascii=False) + "\n" for c in corpus), encoding="utf-8")
+        res = {}
+        for aname, analyzer in ANALYZERS.items():
+            t0 = time.perf_counter()
+            index = EvidenceIndex.build(src, analyzer)
+            build_ms = (time.perf_counter() - t0) * 1000
+            for sname, fn in SCORERS.items():
+                res[f"{aname}/{sname}"] = {"build_ms": build_ms, **evaluate(index, qs, k, fn, family_size)}
+            for backend in BATCH_BACKENDS:
+                res[f"{aname}/{backend}*"] = {"build_ms": build_ms, **evaluate_batch(index, qs, k, backend, family_size)}
+    return res
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Relevance / latency benchmark for evidence retrieval")
+    ap.add_argument("--docs", type=int, default=5000)
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--sample", default=str(SAMPLE), help="existing chunks used as seeds")
+    ap.add_argument("--seeds", nargs="+", choices=SEED_SOURCES, default=list(SEED_SOURCES))
+    a = ap.parse_args()
+    res = run(a.docs, a.queries, a.k, a.seed, a.sample, a.seeds)
+    print(f"corpus {a.docs} chunks from {'+'.join(a.seeds)}, {a.queries} queries  (* = one batched call, amortized ms/query)")
+    print(f"{'analyzer/scorer':<16}{'R@'+str(a.k):>8}{'MRR':>8}{'tagP@'+str(a.k):>8}{'p50 ms':>10}{'p99 ms':>10}{'build ms':>10}")
+    for name, m in res.items():
+        print(f"{name:<16}{m['R@k']:>8.3f}{m['MRR']:>8.3f}{m['tagP@k']:>8.3f}{m['p50_ms']:>10.3f}{m['p99_ms']:>10.3f}{m['build_ms']:>10.0f}")
@@ -0,0 +1,652 @@
+# -*- coding: utf-8 -*-
+"""Evidence index over data/rag_chunks.jsonl.
+
+Inverted index (token → postings of (chunk id, term frequency)) built once and
+persisted next to the JSONL as `<name>.idx` (npz arrays + JSON metadata, no pickle); it is rebuilt only when the source
+file changes (size / mtime), so a query touches only the postings of its tokens.
+Lines appended to the JSONL are indexed incrementally (see get_index).
+Ranking is BM25 with document lengths and IDF precomputed at build time.
+
+Japanese has no spaces, so kanji/kana runs are indexed as character bigrams and
+trigrams (after NFKC, which also folds full/half width); ASCII words stay whole.
+Index and query go through the same analyzer, stored with the index.
+
+Chunks are not held in memory: the JSONL is memory-mapped and only the winning
+chunks of a query are decoded.
+
+Backends: "bm25" (default) and "tfidf" (cosine over log-tf · smoothed idf, L2-normalized).
+search_batch() scores many queries at once as a sparse product over the postings (numpy
+only), for bulk evidence precompute; select with PMO_EVIDENCE_BACKEND.
+
+English: each chunk's English rendering (locale glossary) is computed once at build time,
+stored in `<name>.en` (memory-mapped like the JSONL) and its words are indexed in the
+same postings; English queries are also expanded back to Japanese glossary terms.
+
+Chunks are partitioned by `tag`; search_routed() sends each query to the tags its event
+category routes to (load_routes) and falls back to the whole corpus when too few hit.
+"""
+import hashlib, heapq, json, math, mmap, os, re, sys, threading, time, unicodedata
+from array import array
+from collections import Counter, OrderedDict
+from pathlib import Path
+import numpy as np
+from locale_bundles import en_to_ja_terms, localize_text
+
+RAG_PATH = Path(__file__).resolve().parents[1] / "data" / "rag_chunks.jsonl"
+INDEX_FORMAT = 8
+PROBE = 256
+BM25_K1 = 1.2
+BM25_B = 0.75
+ANALYZER = {"ngrams": (2, 3), "nfkc": True, "en": True}    # ngrams=() → whole runs (previous behaviour)
+BACKENDS = ("bm25", "tfidf")
+BACKEND = os.environ.get("PMO_EVIDENCE_BACKEND", "bm25")
+BATCH_CELLS = 1 << 22          # queries × chunks scored per dense block in search_batch
+BATCH_POSTINGS = 1 << 22       # postings gathered per block
+DENSE_BLOCK = 16               # blocks with this many queries score into a dense (queries × chunks) array
+CACHE_SIZE = 2048             # ranked results kept by RESULTS
+CACHE_TTL = 600.0             # seconds
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "config" / "project.yaml"
+DEFAULT_ROUTES = {"Prep": ["listing_basics"], "Listing": ["listing_basics"], "Viewing": ["viewing_flow"],
+                  "Offer": ["offer_terms"], "Finance": ["finance_closing"], "Close": ["finance_closing"]}
+
+_RUN_RE = re.compile(r"[a-z0-9]+|[ぁ-んァ-ヶー一-龥々〆]+")
+
+def tokenize(s: str, ngrams=ANALYZER["ngrams"], nfkc=ANALYZER["nfkc"], **_):
+    """ASCII words (>= 2 chars) and character n-grams of each kana/kanji run."""
+    if nfkc:
+        s = unicodedata.normalize("NFKC", s)
+    toks = []
+    for run in _RUN_RE.findall(s.lower()):
+        if run[0] <= "z" or not ngrams:
+            if len(run) >= 2: toks.append(run)
+        elif len(run) < ngrams[0]:
+            toks.append(run)
+        else:
+            for n in ngrams:
+                toks.extend(run[i:i+n] for i in range(len(run) - n + 1))
+    return toks
+
+def load_routes(path: Path = CONFIG_PATH):
+    """Event category → chunk tags, from `evidence_routes` in config/project.yaml (needs PyYAML); else DEFAULT_ROUTES."""
+    try:
+        import yaml
+        with open(path, encoding="utf-8") as f:
+            routes = (yaml.safe_load(f) or {}).get("evidence_routes")
+    except Exception:
+        routes = None
+    if not isinstance(routes, dict):
+        return dict(DEFAULT_ROUTES)
+    return {str(k): [str(t) for t in (v if isinstance(v, list) else [v])] for k, v in routes.items()}
+
+def source_sig(path: Path):
+    st = path.stat()
+    return (st.st_size, st.st_mtime_ns)
+
+def index_path(source: Path) -> Path:
+    return source.with_name(source.name + ".idx")
+
+def en_path(source: Path) -> Path:
+    """Sidecar with the English rendering of each chunk, one JSON string per line."""
+    return source.with_name(source.name + ".en")
+
+def _write_en(source: Path, texts, append=False, ino=None):
+    """Write English renderings → (offsets, inode) of the sidecar, or None if it cannot be written.
+
+    A full write goes through a temp file + rename, so mapped readers keep the old file.
+    An append requires the sidecar to still be the file with inode `ino`.
+    """
+    path = en_path(source)
+    try:
+        if append:
+            if not path.exists() or path.stat().st_ino != ino:
+                return None
+            f = path.open("ab")
+        else:
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            f = tmp.open("wb")
+        with f:
+            pos, offsets = f.tell(), array("Q")
+            for t in texts:
+                line = json.dumps(t, ensure_ascii=False).encode("utf-8") + b"\n"
+                offsets.append(pos); pos += len(line); f.write(line)
+        if not append:
+            os.replace(tmp, path)
+        return offsets, path.stat().st_ino
+    except OSError:
+        return None
+
+def _np(a, dtype):
+    """Zero-copy numpy view of an array.array."""
+    return np.frombuffer(a, dtype=dtype) if len(a) else np.zeros(0, dtype)
+
+def _array(typecode, x):
+    out = array(typecode); out.frombytes(np.ascontiguousarray(x, dtype=np.dtype(typecode)).tobytes())
+    return out
+
+class ChunkView:
+    """Read-only sequence over the JSONL lines at `offsets` in a memory map; decodes on access."""
+    def __init__(self, mm, offsets):
+        self._mm, self._offsets = mm, offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, doc):
+        off = self._offsets[doc]
+        end = self._mm.find(b"\n", off)
+        return json.loads(self._mm[off:end if end >= 0 else len(self._mm)])
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+class LazyEnglish:
+    """Fallback when the English sidecar is unavailable: translate the chunk on access."""
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def __getitem__(self, doc):
+        return localize_text(str(self._chunks[doc].get("text","")), "English")
+
+def _map(source: Path):
+    with Path(source).open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+class EvidenceIndex:
+    """Postings are flat arrays: term t owns docs[indptr[t]:indptr[t+1]] (and the same slice
+    of tfs). Chunk text stays in the memory-mapped JSONL; only line offsets are kept, so
+    workers share the corpus through the page cache and decode just the top-k hits.
+    """
+    def __init__(self, source, source_sig, offsets, vocab, indptr, docs, tfs, doc_len, doc_tags, analyzer=None,
+                 end=None, probe=b"", version=0, en=None):
+        self.source = Path(source)
+        self.source_sig = source_sig
+        self.analyzer = dict(analyzer or ANALYZER)
+        self.offsets = offsets        # array('Q'): byte offset of each chunk's line (chunk id = position)
+        self.vocab = vocab            # token -> term id
+        self.indptr, self.docs, self.tfs = indptr, docs, tfs
+        self.doc_len = doc_len        # array('I'): tokens per chunk
+        self.doc_tags = doc_tags      # chunk `tag` per chunk ("" if none)
+        self.end = source_sig[0] if end is None else end    # bytes of the source consumed
+        self.probe = probe            # last PROBE bytes before `end` (append detection)
+        self.version = version        # bumped on every swap in get_index()
+        self.chunks = ChunkView(_map(self.source), offsets)
+        self.en = en                  # (offsets, inode) into the English sidecar, or None
+        self.chunks_en = ChunkView(_map(en_path(self.source)), en[0]) if en else LazyEnglish(self.chunks)
+        self._stats()
+
+    def _stats(self):
+        n = len(self.doc_len)
+        self.avgdl = (sum(self.doc_len) / n) if n else 0.0
+        df = np.diff(_np(self.indptr, np.uint64)).astype(np.float64)
+        self.idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+        self._norm = {}               # (k1, b) -> per-doc length normalization
+        self._weights = {}            # (backend, k1, b) -> per-posting weights (numpy)
+        self._parts = {}              # tags -> (indptr, posting positions) of that partition
+
+    @property
+    def size(self):
+        return len(self.offsets)
+
+    def tokenize(self, text):
+        """Query tokens under the analyzer the index was built with.
+
+        With English indexing on, English glossary terms in the query are expanded to their
+        Japanese originals, so an English query also matches the Japanese n-grams.
+        """
+        text = str(text)
+        if self.analyzer.get("en"):
+            text = " ".join([text] + en_to_ja_terms(text))
+        return tokenize(text, **self.analyzer)
+
+    def chunk(self, doc):
+        """Chunk dict with its English rendering under `text_en`."""
+        c = self.chunks[doc]
+        c["text_en"] = self.chunks_en[doc]
+        return c
+
+    @staticmethod
+    def _scan(f, start, first_doc, analyzer):
+        """Parse JSONL from byte `start` → (offsets, doc_len, doc_tags, en_texts, {tok: [(doc, tf), ...]}, end, probe).
+
+        With analyzer["en"], ASCII tokens of the chunk's English rendering are added to its
+        postings (same chunk id, so Japanese and English share one set of postings).
+
+        An unterminated last line that is not valid JSON yet (still being written) is left
+        for the next scan: `end` stops before it.
+        """
+        offsets, doc_len, doc_tags, en_texts, plists = array("Q"), array("I"), [], [], {}
+        f.seek(start); pos = end = start
+        for raw in f:
+            off = pos; pos += len(raw)
+            line = raw.strip()
+            if line:
+                try:
+                    c = json.loads(line)
+                except Exception:
+                    if not raw.endswith(b"\n"): break
+                    end = pos; continue
+                doc = first_doc + len(offsets); offsets.append(off)
+                text = str(c.get("text",""))
+                counts = Counter(tokenize(text, **analyzer))
+                if analyzer.get("en"):
+                    en = localize_text(text, "English"); en_texts.append(en)
+                    counts |= Counter(t for t in tokenize(en, **analyzer) if t[0] <= "z")
+                doc_len.append(sum(counts.values())); doc_tags.append(sys.intern(str(c.get("tag") or "")))
+                for tok, tf in counts.items():
+                    plists.setdefault(tok, []).append((doc, tf))
+            end = pos
+        f.seek(max(0, end - PROBE))
+        return offsets, doc_len, doc_tags, en_texts, plists, end, f.read(min(end, PROBE))
+
+    @classmethod
+    def build(cls, source: Path, analyzer=None):
+        source = Path(source)
+        sig = source_sig(source)
+        analyzer = dict(analyzer or ANALYZER)
+        with source.open("rb") as f:
+            offsets, doc_len, doc_tags, en_texts, plists, end, probe = cls._scan(f, 0, 0, analyzer)
+        en = _write_en(source, en_texts) if analyzer.get("en") else None
+        vocab, indptr, docs, tfs = {}, array("Q", [0]), array("I"), array("I")
+        for t, (tok, pl) in enumerate(plists.items()):
+            vocab[tok] = t
+            docs.extend(d for d, _ in pl); tfs.extend(tf for _, tf in pl)
+            indptr.append(len(docs))
+        return cls(source, sig, offsets, vocab, indptr, docs, tfs, doc_len, doc_tags, analyzer, end, probe, en=en)
+
+    def appended(self):
+        """New index = this one + the lines appended to the source since `end`.
+
+        None if the file was rewritten: it did not grow since this index was built (a
+        same-size edit with a new mtime), or the bytes before `end` changed. This
+        index is left untouched (copy-on-write), so readers holding it are unaffected.
+        New postings go at the end of each term's range (new chunk ids are the largest),
+        so the merge is a shift of the existing arrays, not a re-sort.
+        """
+        sig = source_sig(self.source)
+        if sig[0] <= self.source_sig[0] or sig[0] < self.end:
+            return None
+        with self.source.open("rb") as f:
+            f.seek(max(0, self.end - PROBE))
+            if f.read(min(self.end, PROBE)) != self.probe:
+                return None
+            offsets, doc_len, doc_tags, en_texts, plists, end, probe = self._scan(f, self.end, self.size, self.analyzer)
+        arrays = (self.offsets, self.vocab, self.indptr, self.docs, self.tfs, self.doc_len, self.doc_tags)
+        en = self.en
+        if offsets:
+            arrays = self._merge(offsets, doc_len, doc_tags, plists)
+            if en:
+                added = _write_en(self.source, en_texts, append=True, ino=en[1])
+                if added is None:
+                    return None         # sidecar replaced by another writer: rebuild
+                en = (en[0] + added[0], en[1])
+        return EvidenceIndex(self.source, sig, *arrays, self.analyzer, end, probe, self.version, en)
+
+    def _merge(self, offsets, doc_len, doc_tags, plists):
+        vocab = dict(self.vocab)
+        for tok in plists:
+            if tok not in vocab: vocab[tok] = len(vocab)
+        ip = _np(self.indptr, np.uint64).astype(np.int64)
+        n_old, n_terms = len(ip) - 1, len(vocab)
+        t_new = np.fromiter((vocab[tok] for tok, pl in plists.items() for _ in pl), dtype=np.int64)
+        d_new = np.fromiter((d for pl in plists.values() for d, _ in pl), dtype=np.int64, count=len(t_new))
+        f_new = np.fromiter((tf for pl in plists.values() for _, tf in pl), dtype=np.int64, count=len(t_new))
+        order = np.argsort(t_new, kind="stable")            # per term, chunk ids stay ascending
+        t_new, d_new, f_new = t_new[order], d_new[order], f_new[order]
+        old_cnt = np.zeros(n_terms, np.int64); old_cnt[:n_old] = np.diff(ip)
+        new_cnt = np.bincount(t_new, minlength=n_terms)
+        ip2 = np.concatenate([[0], np.cumsum(old_cnt + new_cnt)])
+        docs = np.empty(ip2[-1], np.uint32); tfs = np.empty(ip2[-1], np.uint32)
+        t_old = np.repeat(np.arange(n_old), old_cnt[:n_old])
+        at = ip2[t_old] + np.arange(len(t_old)) - ip[t_old]
+        docs[at] = _np(self.docs, np.uint32); tfs[at] = _np(self.tfs, np.uint32)
+        rank = np.arange(len(t_new)) - (np.cumsum(new_cnt) - new_cnt)[t_new]
+        at = ip2[t_new] + old_cnt[t_new] + rank
+        docs[at] = d_new; tfs[at] = f_new
+        return (self.offsets + offsets, vocab, _array("Q", ip2), _array("I", docs), _array("I", tfs),
+                self.doc_len + doc_len, self.doc_tags + doc_tags)
+
+    def save(self, path: Path):
+        """Arrays as .npz (no pickled objects); vocab, tags and the rest as a JSON `meta` member."""
+        meta = {"format": INDEX_FORMAT, "source_sig": list(self.source_sig), "analyzer": self.analyzer,
+                "vocab": sorted(self.vocab, key=self.vocab.get), "doc_tags": list(self.doc_tags),
+                "end": self.end, "probe": self.probe.hex(), "en_ino": self.en[1] if self.en else None}
+        arrays = {"offsets": _np(self.offsets, np.uint64), "indptr": _np(self.indptr, np.uint64),
+                  "docs": _np(self.docs, np.uint32), "tfs": _np(self.tfs, np.uint32),
+                  "doc_len": _np(self.doc_len, np.uint32),
+                  "en_offsets": _np(self.en[0], np.uint64) if self.en else np.zeros(0, np.uint64),
+                  "meta": np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), np.uint8)}
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, source: Path):
+        with np.load(path, allow_pickle=False) as z:
+            d = {k: z[k] for k in z.files}
+        meta = json.loads(d["meta"].tobytes().decode("utf-8"))
+        if meta.get("format") != INDEX_FORMAT:
+            raise ValueError("index format mismatch")
+        ino = meta["en_ino"]
+        if ino is not None and (not en_path(source).exists() or en_path(source).stat().st_ino != ino):
+            raise ValueError("English sidecar missing or replaced")
+        analyzer = dict(meta["analyzer"], ngrams=tuple(meta["analyzer"].get("ngrams", ())))
+        en = (_array("Q", d["en_offsets"]), ino) if ino is not None else None
+        return cls(source, tuple(meta["source_sig"]), _array("Q", d["offsets"]),
+                   {tok: t for t, tok in enumerate(meta["vocab"])}, _array("Q", d["indptr"]),
+                   _array("I", d["docs"]), _array("I", d["tfs"]), _array("I", d["doc_len"]),
+                   meta["doc_tags"], analyzer, meta["end"], bytes.fromhex(meta["probe"]), en=en)
+
+    def _length_norm(self, k1, b):
+        key = (k1, b)
+        if key not in self._norm:
+            avg = self.avgdl or 1.0
+            self._norm[key] = [k1 * (1 - b + b * dl / avg) for dl in self.doc_len]
+        return self._norm[key]
+
+    def search(self, q_tokens, topk=3, k1=BM25_K1, b=BM25_B):
+        """[(score, chunk), ...] best first by BM25 (ties: file order)."""
+        norm = self._length_norm(k1, b)
+        scores = {}
+        for tok in set(q_tokens):
+            t = self.vocab.get(tok)
+            if t is None: continue
+            lo, hi = self.indptr[t], self.indptr[t+1]
+            w = self.idf[t] * (k1 + 1)
+            for doc, tf in zip(self.docs[lo:hi], self.tfs[lo:hi]):
+                scores[doc] = scores.get(doc, 0.0) + w * tf / (tf + norm[doc])
+        top = heapq.nlargest(topk, scores.items(), key=lambda x: (x[1], -x[0]))
+        return [(s, self.chunk(doc)) for doc, s in top]
+
+    def search_overlap(self, q_tokens, topk=3):
+        """Previous scorer (query-token occurrences in the chunk); kept as a benchmark baseline."""
+        scores = Counter()
+        for tok in set(q_tokens):
+            t = self.vocab.get(tok)
+            if t is None: continue
+            lo, hi = self.indptr[t], self.indptr[t+1]
+            for doc, tf in zip(self.docs[lo:hi], self.tfs[lo:hi]):
+                scores[doc] += tf
+        top = heapq.nlargest(topk, scores.items(), key=lambda x: (x[1], -x[0]))
+        return [(s, self.chunk(doc)) for doc, s in top]
+
+    # ---- sparse matrix path ----
+    def _arrays(self):
+        return (_np(self.indptr, np.uint64).astype(np.int64), _np(self.docs, np.uint32).astype(np.int64),
+                _np(self.tfs, np.uint32).astype(np.float64))
+
+    def _tfidf_idf(self, ip):
+        return np.log((1 + self.size) / (1 + np.diff(ip))) + 1.0
+
+    def _posting_weights(self, backend, k1=BM25_K1, b=BM25_B):
+        """(indptr, docs, weights): the term-major sparse matrix of chunk weights for `backend`."""
+        key = (backend, k1, b)
+        if key not in self._weights:
+            ip, docs, tf = self._arrays()
+            term = np.repeat(np.arange(len(ip) - 1), np.diff(ip))
+            if backend == "bm25":
+                dl = np.asarray(self.doc_len, dtype=np.float64)
+                norm = k1 * (1 - b + b * dl[docs] / (self.avgdl or 1.0))
+                w = np.asarray(self.idf)[term] * (k1 + 1) * tf / (tf + norm)
+            elif backend == "tfidf":
+                w = (1 + np.log(tf)) * self._tfidf_idf(ip)[term]
+                dnorm = np.sqrt(np.bincount(docs, weights=w * w, minlength=self.size))
+                w = w / dnorm[docs]
+            else:
+                raise ValueError(f"unknown evidence backend: {backend}")
+            self._weights[key] = (ip, docs, w)
+        return self._weights[key]
+
+    def _query_weights(self, q_tokens, backend, ip):
+        terms = Counter(self.vocab[t] for t in q_tokens if t in self.vocab)
+        if backend == "bm25":
+            return list(terms), [1.0] * len(terms)
+        idf = self._tfidf_idf(ip)
+        w = [(1 + math.log(c)) * idf[t] for t, c in terms.items()]
+        n = math.sqrt(sum(x * x for x in w)) or 1.0
+        return list(terms), [x / n for x in w]
+
+    def _partition(self, tags, backend):
+        """(indptr, local docs, weights, chunk ids) restricted to chunks whose tag is in `tags`.
+
+        Postings are renumbered to partition-local ids 0..m-1 (chunk ids = ids[local]), so
+        scoring is sized to the partition; idf and lengths stay global.
+        """
+        key = (tags, backend)
+        if key not in self._parts:
+            ip, docs, w = self._posting_weights(backend)
+            keep_doc = np.fromiter((t in tags for t in self.doc_tags), dtype=bool, count=self.size)
+            keep = keep_doc[docs]
+            local = np.cumsum(keep_doc) - 1
+            term = np.repeat(np.arange(len(ip) - 1), np.diff(ip))
+            cnt = np.bincount(term[keep], minlength=len(ip) - 1)
+            self._parts[key] = (np.concatenate([[0], np.cumsum(cnt)]), local[docs[keep]], w[keep],
+                                np.flatnonzero(keep_doc))
+        return self._parts[key]
+
+    def _score_block(self, block, ip, docs, w, topk, n=None, dense=None):
+        """block = [(terms, weights), ...] → [[(score, doc id), ...], ...]; one scatter-add per block.
+
+        Small blocks score only the chunks their postings touch (np.unique + a scatter-add
+        sized to them); blocks of DENSE_BLOCK or more queries scatter into a dense
+        (queries × n) array, n = ids in `docs`. Both rank the same (ties: lower id first).
+        """
+        n = self.size if n is None else n
+        dense = len(block) >= DENSE_BLOCK if dense is None else dense
+        qi = np.repeat(np.arange(len(block)), [len(t) for t, _ in block])
+        ti = np.fromiter((t for terms, _ in block for t in terms), dtype=np.int64, count=len(qi))
+        qw = np.fromiter((x for _, ws in block for x in ws), dtype=np.float64, count=len(qi))
+        starts = ip[ti]; lens = ip[ti + 1] - starts
+        tot = int(lens.sum())
+        if not tot:
+            return [[] for _ in block]
+        pos = np.repeat(starts - (np.cumsum(lens) - lens), lens) + np.arange(tot)
+        if dense:
+            cols, col = None, docs[pos]
+        else:
+            cols, col = np.unique(docs[pos], return_inverse=True)
+            n = len(cols)
+        cell = np.repeat(qi, lens) * n + col
+        scores = np.bincount(cell, weights=np.repeat(qw, lens) * w[pos],
+                             minlength=len(block) * n).reshape(len(block), n)
+        ids = (lambda c: c) if cols is None else (lambda c: cols[c])
+        out = []
+        for row in scores:
+            hit = int(np.count_nonzero(row))
+            if not hit:
+                out.append([]); continue
+            k = min(topk, hit)
+            thr = row[np.argpartition(-row, k - 1)[k - 1]]
+            cand = np.flatnonzero(row >= thr)
+            cand = cand[np.lexsort((cand, -row[cand]))][:k]
+            out.append([(float(row[c]), int(ids(c))) for c in cand])
+        return out
+
+    def _search_ids(self, queries, topk, backend, tags=None):
+        n = self.size
+        if not n:
+            return [[] for _ in queries]
+        ip_all, docs, w = self._posting_weights(backend)
+        ip, ids = ip_all, None
+        if tags:
+            ip, docs, w, ids = self._partition(tags, backend)
+            n = len(ids)
+            if not n:
+                return [[] for _ in queries]
+        out, block, cells, posts = [], [], 0, 0
+        for toks in queries:
+            terms, weights = self._query_weights(toks, backend, ip_all)
+            plen = int(sum(ip[t+1] - ip[t] for t in terms))
+            if block and (cells + n > BATCH_CELLS or posts + plen > BATCH_POSTINGS):
+                out += self._score_block(block, ip, docs, w, topk, n); block, cells, posts = [], 0, 0
+            block.append((terms, weights)); cells += n; posts += plen
+        if block:
+            out += self._score_block(block, ip, docs, w, topk, n)
+        if ids is not None:
+            out = [[(s, int(ids[d])) for s, d in r] for r in out]
+        return out
+
+    def search_batch(self, queries, topk=3, backend=BACKEND, tags=None):
+        """search() for many token lists at once → [[(score, chunk), ...], ...] in query order.
+
+        Queries are grouped into blocks (bounded by BATCH_CELLS score cells and BATCH_POSTINGS
+        gathered postings); each block is one scatter-add (np.bincount) of query weight ×
+        posting weight into a (queries × touched chunks) score array — dense over the corpus
+        for large blocks — then top-k per row by argpartition, ties broken by file order as
+        in search(). `tags` restricts the search to that partition of the corpus.
+        """
+        tags = frozenset(tags) if tags else None
+        return [[(s, self.chunk(d)) for s, d in r] for r in self._search_ids(queries, topk, backend, tags)]
+
+    def search_routed(self, queries, routes, topk=3, backend=BACKEND, min_hits=None):
+        """Tag-routed search: routes[i] = tags for queries[i] (empty = whole corpus).
+
+        Each query searches its partition first; if fewer than `min_hits` (default topk)
+        come back, the global results fill the remaining slots.
+        """
+        min_hits = topk if min_hits is None else min_hits
+        out, groups, short = [None] * len(queries), {}, []
+        for i, r in enumerate(routes):
+            groups.setdefault(frozenset(r or ()), []).append(i)
+        for tags, idx in groups.items():
+            for i, r in zip(idx, self._search_ids([queries[i] for i in idx], topk, backend, tags or None)):
+                out[i] = r
+                if tags and len(r) < min_hits: short.append(i)
+        if short:
+            for i, r in zip(short, self._search_ids([queries[i] for i in short], topk, backend)):
+                seen = {d for _, d in out[i]}
+                out[i] = out[i] + [x for x in r if x[1] not in seen][:topk - len(out[i])]
+        return [[(s, self.chunk(d)) for s, d in r] for r in out]
+
+    def query(self, q_tokens, topk=3, backend=BACKEND, tags=None):
+        """Single query through the configured backend (vectorized; same ranking as search() for bm25)."""
+        return self.search_routed([q_tokens], [tags], topk, backend)[0]
+
+# ===================== Shared, lazily refreshed index =====================
+_indexes = {}
+_lock = threading.Lock()
+
+def get_index(source: Path = RAG_PATH):
+    """Current index for `source` (None if the file is missing).
+
+    Reuses the in-memory index while the file is unchanged. Appended lines are added
+    to a copy of the live index which is then swapped in; a rewrite rebuilds. On
+    first use the persisted `.idx` is loaded (and caught up) if it matches. While one
+    caller updates, others keep getting the previous index instead of waiting.
+    The request that notices the change pays for it: the append plus a re-save of the
+    whole `.idx`, O(corpus) per update, inline on that request's search.
+    """
+    source = Path(source)
+    if not source.exists():
+        return None
+    idx = _indexes.get(source)
+    if idx is not None and idx.source_sig == source_sig(source):
+        return idx
+    if not _lock.acquire(blocking=idx is None):
+        return idx
+    try:
+        cur = _indexes.get(source)
+        if cur is not None and cur.source_sig == source_sig(source):
+            return cur
+        ipath = index_path(source)
+        base = cur
+        if base is None and ipath.exists():
+            try:
+                base = EvidenceIndex.load(ipath, source)
+            except Exception:
+                base = None
+        idx = base
+        if base is None or base.analyzer != ANALYZER or base.source_sig != source_sig(source):
+            idx = base.appended() if base is not None and base.analyzer == ANALYZER else None
+            if idx is None:
+                idx = EvidenceIndex.build(source)
+            try:
+                idx.save(ipath)
+            except OSError:
+                pass          # read-only data dir: keep the in-memory index
+        idx.version = (cur.version + 1) if cur is not None else 0
+        _indexes[source] = idx
+        return idx
+    finally:
+        _lock.release()
+
+# ===================== Ranked-result cache =====================
+class ResultCache:
+    """LRU + TTL cache of ranked results per (source, index version, query-token hash, route, k, backend).
+
+    A new index version (append / rebuild) drops that source's entries on the next access.
+    """
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()      # key -> (stored_at, results)
+        self._versions = {}             # source -> index version seen
+        self.hits = self.misses = self.evictions = self.expired = self.invalidated = 0
+
+    @staticmethod
+    def key(index, q_tokens, tags, topk, backend):
+        h = hashlib.blake2b("\x1f".join(q_tokens).encode("utf-8"), digest_size=16).hexdigest()
+        return (str(index.source), index.version, h, tuple(sorted(tags or ())), topk, backend)
+
+    def _sync(self, index):
+        src = str(index.source)
+        if self._versions.get(src, index.version) != index.version:
+            stale = [k for k in self._data if k[0] == src]
+            for k in stale: del self._data[k]
+            self.invalidated += len(stale)
+        self._versions[src] = index.version
+
+    def get(self, index, key):
+        with self._lock:
+            self._sync(index)
+            hit = self._data.get(key)
+            if hit is not None and time.monotonic() - hit[0] > self.ttl:
+                del self._data[key]; self.expired += 1; hit = None
+            if hit is None:
+                self.misses += 1; return None
+            self._data.move_to_end(key); self.hits += 1
+            return hit[1]
+
+    def peek(self, index, key):
+        """True if `key` holds a fresh result (not counted as a hit or miss, LRU order unchanged)."""
+        with self._lock:
+            self._sync(index)
+            hit = self._data.get(key)
+            return hit is not None and time.monotonic() - hit[0] <= self.ttl
+
+    def put(self, index, key, results):
+        with self._lock:
+            self._sync(index)
+            if key[1] != index.version: return
+            self._data[key] = (time.monotonic(), results)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False); self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            n = self.hits + self.misses
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": (self.hits / n) if n else None, "evictions": self.evictions,
+                    "expired": self.expired, "invalidated": self.invalidated}
+
+RESULTS = ResultCache()
+
+def search_cached(index, queries, routes, topk=3, backend=BACKEND, cache=RESULTS):
+    """index.search_routed() through `cache`; only the misses are searched (as one batch)."""
+    keys = [cache.key(index, q, r, topk, backend) for q, r in zip(queries, routes)]
+    out = [cache.get(index, k) for k in keys]
+    miss = [i for i, r in enumerate(out) if r is None]
+    if miss:
+        res = index.search_routed([queries[i] for i in miss], [routes[i] for i in miss], topk, backend)
+        for i, r in zip(miss, res):
+            out[i] = r; cache.put(index, keys[i], r)
+    return out
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Monte-Carlo time-to-offer projection on the KPI funnel (pv → inquiries → viewings → offers).
+
+Each simulation draws the listing's rates from Beta posteriors of its observed counts
+(and daily pv from a Gamma posterior), then the day of the first offer after `as_of` as
+a single geometric draw. For a listing that already has offers that is the time to its
+next offer (`offers` in the result says which). Each property has its own seeded RNG stream, so batch and single results match.
+
+Nightly batch:  python app/funnel_projection.py --sims 5000 --horizon 180
+"""
+import threading, zlib
+import numpy as np
+import pandas as pd
+from kpi_rollup import METRICS
+
+SIMS = 4000
+HORIZON = 180          # days
+QUANTILES = (0.5, 0.8)
+
+def funnel_params(totals: dict, days: int):
+    """Observed counts → posterior parameters used by simulate()."""
+    pv, inq, view, off = (max(int(totals[m]), 0) for m in METRICS)
+    return {"days": max(int(days), 1), "pv": pv, "inq": min(inq, pv),
+            "view": min(view, inq), "off": min(off, view)}
+
+def _draw_rates(params, sims, rng):
+    p = params
+    lam = rng.gamma(0.5 + p["pv"], 1.0 / p["days"], sims)          # daily pv (Jeffreys prior)
+    p1 = rng.beta(1 + p["inq"], 1 + p["pv"] - p["inq"], sims)
+    p2 = rng.beta(1 + p["view"], 1 + p["inq"] - p["view"], sims)
+    p3 = rng.beta(1 + p["off"], 1 + p["view"] - p["off"], sims)
+    return lam, p1, p2, p3
+
+def simulate(params_list, sims=SIMS, horizon=HORIZON, rng=None):
+    """Days to first offer, shape (len(params_list), sims); 0 = none within `horizon`.
+
+    Given a run's rates, daily pv ~ Poisson(lam) thinned by three binomial stages is
+    daily offers ~ Poisson(lam*p1*p2*p3), so the first offer day is geometric in
+    1 - exp(-lam*p1*p2*p3): one draw per run replaces stepping through the days.
+    `rng`: one Generator for all rows, or a list with one per row (a row's result then
+    does not depend on which batch it ran in).
+    """
+    rngs = rng if isinstance(rng, (list, tuple)) else [rng or np.random.default_rng()] * len(params_list)
+    first = np.zeros((len(params_list), sims), dtype=np.int64)
+    for row, p, g in zip(first, params_list, rngs):
+        lam, p1, p2, p3 = _draw_rates(p, sims, g)
+        q = -np.expm1(-lam * p1 * p2 * p3)                 # P(at least one offer on a day)
+        ok = q > 0
+        row[ok] = g.geometric(q[ok])
+    first[first > horizon] = 0
+    return first
+
+def summarize(first_row, horizon=HORIZON, quantiles=QUANTILES):
+    """{'p50': days|None, 'p80': days|None, 'within': share with an offer in horizon}; None = beyond horizon."""
+    x = np.where(first_row > 0, first_row, horizon + 1)
+    out = {"within": float((first_row > 0).mean())}
+    for q in quantiles:
+        v = int(np.ceil(np.quantile(x, q)))
+        out[f"p{int(q*100)}"] = v if v <= horizon else None
+    return out
+
+def _seed(pid):
+    return zlib.crc32(str(pid).encode("utf-8"))
+
+# ===================== Cached per-property projection =====================
+class OfferProjection:
+    """Projection per property, recomputed only when that property's KPI totals change."""
+    def __init__(self, sims=SIMS, horizon=HORIZON):
+        self.sims, self.horizon = sims, horizon
+        self._lock = threading.Lock()
+        self._cache = {}                 # pid -> (signature, result)
+
+    @staticmethod
+    def signature(rollup):
+        return (len(rollup.days),) + tuple(rollup.cum[m][-1] for m in METRICS)
+
+    def _result(self, rollup, summary):
+        last = pd.Timestamp.fromordinal(rollup.days[-1])
+        for k in [k for k in summary if k.startswith("p")]:
+            summary[k + "_date"] = (last + pd.Timedelta(days=summary[k])).date() if summary[k] else None
+        summary["as_of"] = last.date()
+        summary["offers"] = int(rollup.cum["offers"][-1])      # > 0: p50/p80 are for the next offer
+        return summary
+
+    def get(self, pid, rollup):
+        if rollup is None or not rollup.days:
+            return None
+        sig = self.signature(rollup)
+        with self._lock:
+            hit = self._cache.get(pid)
+            if hit and hit[0] == sig:
+                return hit[1]
+        params = funnel_params(rollup.totals(), len(rollup.days))
+        first = simulate([params], self.sims, self.horizon, [np.random.default_rng(_seed(pid))])[0]
+        res = self._result(rollup, summarize(first, self.horizon))
+        with self._lock:
+            self._cache[pid] = (sig, res)
+        return res
+
+    def portfolio(self, rollups: dict, batch=32):
+        """All properties, `batch` listings per vectorized simulation; skips cached ones."""
+        todo = []
+        with self._lock:
+            for pid, r in rollups.items():
+                hit = self._cache.get(pid)
+                if r.days and not (hit and hit[0] == self.signature(r)):
+                    todo.append(pid)
+        for i in range(0, len(todo), batch):
+            pids = todo[i:i+batch]
+            params = [funnel_params(rollups[p].totals(), len(rollups[p].days)) for p in pids]
+            first = simulate(params, self.sims, self.horizon, [np.random.default_rng(_seed(p)) for p in pids])
+            with self._lock:
+                for pid, row in zip(pids, first):
+                    self._cache[pid] = (self.signature(rollups[pid]), self._result(rollups[pid], summarize(row, self.horizon)))
+        with self._lock:
+            return {pid: self._cache[pid][1] for pid in rollups if pid in self._cache}
+
+if __name__ == "__main__":
+    import argparse, time
+    from pathlib import Path
+    from kpi_rollup import KpiStore
+    root = Path(__file__).resolve().parents[1]
+    ap = argparse.ArgumentParser(description="Nightly time-to-first-offer projection for every property in kpi.csv")
+    ap.add_argument("--kpi", default=str(root / "data" / "kpi.csv"))
+    ap.add_argument("--out", default=str(root / "data" / "offer_projection.csv"))
+    ap.add_argument("--sims", type=int, default=SIMS)
+    ap.add_argument("--horizon", type=int, default=HORIZON)
+    a = ap.parse_args()
+    t0 = time.perf_counter()
+    store = KpiStore(a.kpi).refresh()
+    if store.df is None:
+        raise SystemExit(store.error or f"not found: {a.kpi}")
+    res = OfferProjection(a.sims, a.horizon).portfolio(store.rollups)
+    out = pd.DataFrame([{"property_id": pid, **r} for pid, r in sorted(res.items())])
+    out.to_csv(a.out, index=False)
+    print(f"{len(out)} properties, {a.sims} sims each, {time.perf_counter()-t0:.1f}s → {a.out}")
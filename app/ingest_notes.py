@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""Ingest long Markdown / plain-text notes into data/rag_chunks.jsonl.
+
+Streaming generator pipeline, one file at a time:
+    read_blocks (page markers, headings, paragraphs) → split_sentences → pack_chunks
+    → dedupe (content hash, also against the existing JSONL) → assign_tag → JSONL append
+Large batches parse files in a process pool; dedupe and writing stay in this process.
+The evidence index then picks up the appended lines incrementally.
+
+    python app/ingest_notes.py notes/ --max-chars 180
+    python app/ingest_notes.py a.md b.txt --tag viewing_flow --dry-run
+"""
+import hashlib, json, os, re, shutil, sys, unicodedata
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from evidence_index import RAG_PATH, get_index, load_routes
+
+NOTE_SUFFIXES = {".md", ".markdown", ".txt"}
+MAX_CHARS = 180
+MIN_CHARS = 20
+POOL_MIN_FILES = 8            # below this, parse in-process
+POOL_WINDOW = 4               # files submitted but not yet consumed, per worker
+PAGE_RE = re.compile(r"^\s*(?:<!--\s*|-{3,}\s*|\[)?\s*(?:page|p\.|ページ|頁)\s*[:：.]?\s*(\d+)\s*(?:-->|-{3,}|\])?\s*$", re.I)
+HEADING_RE = re.compile(r"^\s*#{1,6}\s+(.*)$")
+# Sentence = shortest run up to 。！？!? (plus closing quotes), or up to a "." followed by
+# whitespace / end, so "3.5" and "p.12" stay inside a sentence.
+SENT_RE = re.compile(r"""(.*?(?:[。！？!?]+[」』）)"']*|\.+[」』）)"']*(?=\s|$)|$))""")
+TAG_KEYWORDS = {
+    "listing_basics": ["掲載", "写真", "媒介", "査定", "ポータル", "間取", "告知", "listing", "photo"],
+    "viewing_flow": ["内覧", "鍵", "動線", "スロット", "案内", "viewing", "showing"],
+    "offer_terms": ["申込", "価格", "交渉", "手付", "条件", "買付", "offer", "price"],
+    "finance_closing": ["決済", "融資", "抹消", "残債", "司法書士", "引渡", "ローン", "closing", "loan"],
+}
+DEFAULT_TAG = "general"       # not routed: reached only through the global fill of a search
+
+# ===================== Pipeline stages =====================
+def iter_note_files(paths):
+    for p in map(Path, paths):
+        if p.is_dir():
+            yield from sorted(q for q in p.rglob("*") if q.suffix.lower() in NOTE_SUFFIXES)
+        elif p.exists():
+            yield p
+
+def read_blocks(path: Path):
+    """(page, heading, paragraph) per blank-line separated paragraph; streams the file line by line.
+
+    Page markers: `<!-- page: 12 -->`, `--- p.12 ---`, `[ページ 12]`, or a form feed (next page).
+    """
+    page, heading, buf = 1, "", []
+    def flush():
+        text = " ".join(s.strip() for s in buf if s.strip())
+        buf.clear()
+        return text
+    with path.open(encoding="utf-8", errors="replace") as f:
+        for line in f:
+            for j, part in enumerate(line.split("\f")):
+                if j:
+                    text = flush()
+                    if text: yield page, heading, text
+                    page += 1
+                m = PAGE_RE.match(part)
+                h = HEADING_RE.match(part)
+                if m or h or not part.strip():
+                    text = flush()
+                    if text: yield page, heading, text
+                    if m: page = int(m.group(1))
+                    if h: heading = h.group(1).strip()
+                else:
+                    buf.append(part)
+    text = flush()
+    if text: yield page, heading, text
+
+def split_sentences(text: str):
+    for s in SENT_RE.findall(text):
+        s = s.strip()
+        if s: yield s
+
+def pack_chunks(blocks, max_chars=MAX_CHARS, min_chars=MIN_CHARS):
+    """Group sentences of each paragraph into chunks of <= max_chars (page / heading kept).
+
+    Sentences never straddle chunks unless a single sentence is longer than max_chars (then
+    it is cut at a space where there is one); a short tail is merged into the previous chunk of the same paragraph.
+    """
+    for page, heading, para in blocks:
+        cur, out = "", []
+        for s in split_sentences(para):
+            while len(s) > max_chars:
+                if cur: out.append(cur); cur = ""
+                cut = s.rfind(" ", max_chars // 2, max_chars + 1)   # prefer a word boundary
+                cut = cut if cut > 0 else max_chars
+                out.append(s[:cut].rstrip()); s = s[cut:].lstrip()
+            if cur and len(cur) + len(s) > max_chars:
+                out.append(cur); cur = ""
+            cur += s if not cur or cur.endswith(("。", "！", "？")) else " " + s
+        if cur:
+            if out and len(cur) < min_chars and len(out[-1]) + len(cur) <= max_chars * 1.5:
+                out[-1] += cur
+            else:
+                out.append(cur)
+        for text in out:
+            yield page, heading, text
+
+def content_hash(text: str) -> str:
+    norm = re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip().lower()
+    return hashlib.blake2b(norm.encode("utf-8"), digest_size=12).hexdigest()
+
+def dedupe(chunks, seen: set):
+    for page, heading, text in chunks:
+        h = content_hash(text)
+        if h in seen: continue
+        seen.add(h)
+        yield h, page, heading, text
+
+def assign_tag(text: str, heading="", keywords=TAG_KEYWORDS, default=DEFAULT_TAG):
+    """Tag with the most keyword hits (heading hits count double); `default` if none."""
+    low_t, low_h = text.lower(), heading.lower()
+    best, best_n = default, 0
+    for tag, words in keywords.items():
+        n = sum(low_t.count(w.lower()) + 2 * low_h.count(w.lower()) for w in words)
+        if n > best_n: best, best_n = tag, n
+    return best
+
+def file_chunks(path, max_chars=MAX_CHARS, min_chars=MIN_CHARS):
+    """One file → [(page, heading, text), ...] (process-pool unit)."""
+    return list(pack_chunks(read_blocks(Path(path)), max_chars, min_chars))
+
+# ===================== Driver =====================
+def existing_hashes(out: Path):
+    seen = set()
+    if out.exists():
+        with out.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    seen.add(content_hash(str(json.loads(line).get("text", ""))))
+                except Exception:
+                    continue
+    return seen
+
+def pooled_chunks(pool, files, max_chars, min_chars, window):
+    """file_chunks() per file, in file order, with at most `window` files submitted and not yet yielded."""
+    todo, running, ready, nxt = iter(enumerate(files)), {}, {}, 0
+    def fill():
+        while len(running) + len(ready) < window:
+            item = next(todo, None)
+            if item is None: return
+            running[pool.submit(file_chunks, item[1], max_chars, min_chars)] = item[0]
+    fill()
+    while running or ready:
+        if nxt in ready:
+            yield ready.pop(nxt); nxt += 1
+            fill(); continue
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for f in done:
+            ready[running.pop(f)] = f.result()
+
+def iter_records(paths, max_chars=MAX_CHARS, min_chars=MIN_CHARS, workers=None, seen=None, tag=None):
+    """Chunk records for all notes, in file order; parsing fans out to a pool for large batches.
+
+    The pool gets a bounded window of files, so memory stays flat however many notes are passed.
+    """
+    files = list(iter_note_files(paths))
+    seen = set() if seen is None else seen
+    if workers != 0 and len(files) >= POOL_MIN_FILES:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        window = POOL_WINDOW * (workers or os.cpu_count() or 1)
+        per_file = pooled_chunks(pool, files, max_chars, min_chars, window)
+    else:
+        pool = None
+        per_file = (pack_chunks(read_blocks(p), max_chars, min_chars) for p in files)
+    try:
+        for path, chunks in zip(files, per_file):
+            for h, page, heading, text in dedupe(chunks, seen):
+                yield {"id": f"N{h[:10]}", "tag": tag or assign_tag(text, heading), "text": text,
+                       "source": path.stem, "page": page}
+    finally:
+        if pool: pool.shutdown(cancel_futures=True)
+
+def append_jsonl(records, out: Path):
+    """Append records (one JSON per line); returns the count. Keeps the file newline-terminated.
+
+    Writes a copy and swaps it in with os.replace, so a running app that has the old file
+    memory-mapped keeps reading the old inode and never sees it change under the mapping.
+    """
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.tmp")
+    n = 0
+    try:
+        with tmp.open("w+b") as f:
+            if out.exists():
+                with out.open("rb") as r:
+                    shutil.copyfileobj(r, f)
+            if f.tell():
+                f.seek(-1, 2)
+                if f.read(1) != b"\n": f.write(b"\n")
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False).encode("utf-8") + b"\n"); n += 1
+        if n:
+            os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return n
+
+if __name__ == "__main__":
+    import argparse, time
+    from collections import Counter
+    ap = argparse.ArgumentParser(description="Chunk long notes into rag_chunks.jsonl and update the evidence index")
+    ap.add_argument("paths", nargs="+", help="note files or directories (.md / .txt)")
+    ap.add_argument("--out", default=str(RAG_PATH))
+    ap.add_argument("--max-chars", type=int, default=MAX_CHARS)
+    ap.add_argument("--min-chars", type=int, default=MIN_CHARS)
+    ap.add_argument("--workers", type=int, default=None, help="process pool size (0 = no pool)")
+    ap.add_argument("--tag", default=None, help="force one tag instead of keyword tagging")
+    ap.add_argument("--dry-run", action="store_true", help="print chunks instead of appending")
+    ap.add_argument("--no-index", action="store_true", help="skip the index update")
+    a = ap.parse_args()
+    t0 = time.perf_counter()
+    out = Path(a.out)
+    recs = iter_records(a.paths, a.max_chars, a.min_chars, a.workers, existing_hashes(out), a.tag)
+    if a.dry_run:
+        n = 0
+        for r in recs:
+            sys.stdout.write(json.dumps(r, ensure_ascii=False) + "\n"); n += 1
+        print(f"{n} chunks (dry run)", file=sys.stderr)
+        raise SystemExit(0)
+    routed, unrouted = {t for ts in load_routes().values() for t in ts}, Counter()
+    def count_unrouted(records):
+        for r in records:
+            if r["tag"] not in routed: unrouted[r["tag"]] += 1
+            yield r
+    n = append_jsonl(count_unrouted(recs), out)
+    msg = f"{n} new chunks → {out} ({time.perf_counter()-t0:.1f}s)"
+    if unrouted:
+        msg += "; not in evidence_routes (global fallback only): " + ", ".join(f"{t}={c}" for t, c in unrouted.items())
+    if n and not a.no_index:
+        idx = get_index(out)
+        msg += f"; index: {idx.size} chunks"
+    print(msg)
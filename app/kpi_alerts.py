@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Streaming calm alerts: EWMA baseline per (property, rate) with persistence + hysteresis.
+
+Input is the 7-day rolling rate series (kpi_trends), consumed one completed day at a
+time, so each update is O(1). An alert turns on only after `persist` consecutive days
+at z <= -z_on below the listing's own baseline, and off after `clear` days at z > -z_off.
+"""
+import threading
+from kpi_rollup import RATES
+
+class EwmaTrack:
+    __slots__ = ("mean", "var", "n", "obs", "low", "ok", "alert", "since")
+
+    def __init__(self):
+        self.mean = 0.0; self.var = 0.0; self.n = 0     # n: days in the baseline (frozen while alerting)
+        self.obs = 0                                     # obs: all days seen
+        self.low = 0; self.ok = 0; self.alert = False; self.since = None
+
+class CalmAlerts:
+    def __init__(self, alpha=0.1, z_on=2.0, z_off=1.0, persist=3, clear=3, min_obs=14,
+                 min_std=0.005, rel_std=0.1, window=7):
+        self.alpha, self.z_on, self.z_off = alpha, z_on, z_off
+        self.persist, self.clear, self.min_obs = persist, clear, min_obs
+        self.min_std, self.rel_std, self.window = min_std, rel_std, window
+        self._lock = threading.Lock()
+        self._props = {}       # pid -> (RollingRates, consumed, {kind: EwmaTrack})
+
+    def _step(self, t: EwmaTrack, x, day):
+        t.obs += 1
+        if t.n >= self.min_obs:
+            std = max(t.var ** 0.5, self.min_std, self.rel_std * abs(t.mean))
+            z = (x - t.mean) / std
+            if z <= -self.z_on:
+                t.low += 1; t.ok = 0
+            elif z > -self.z_off:
+                t.ok += 1; t.low = 0
+            else:
+                t.low = 0; t.ok = 0          # between thresholds: hold current state
+            if not t.alert and t.low >= self.persist:
+                t.alert, t.since = True, day
+            elif t.alert and t.ok >= self.clear:
+                t.alert, t.since = False, None
+        # EWMA mean / variance (incremental form); frozen while alerting so a
+        # sustained drop is not absorbed into the baseline it is judged against
+        if t.alert:
+            return
+        if t.n == 0:
+            t.mean = x
+        else:
+            d = x - t.mean; inc = self.alpha * d
+            t.mean += inc; t.var = (1 - self.alpha) * (t.var + d * inc)
+        t.n += 1
+
+    def update(self, pid, trends):
+        """Consume newly completed days of `trends[window]`; returns {kind: True/False/None}.
+
+        None = not enough history yet (callers fall back to fixed thresholds).
+        """
+        rr = trends[self.window]
+        with self._lock:
+            hit = self._props.get(pid)
+            if hit is None or hit[0] is not rr:
+                hit = [rr, 0, {k: EwmaTrack() for k in RATES}]
+                self._props[pid] = hit
+            done = len(rr.series) - 1          # the newest day may still receive rows
+            for i in range(hit[1], max(done, 0)):
+                point = rr.series[i]
+                for k, t in hit[2].items():
+                    if point[k] is not None:
+                        self._step(t, point[k], rr.days[i])
+            hit[1] = max(hit[1], done)
+            return {k: (t.alert if t.alert or t.obs >= self.min_obs + self.persist else None) for k, t in hit[2].items()}
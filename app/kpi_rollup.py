@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""KPI store: incremental kpi.csv loading + prefix-sum rollups for range totals.
+
+kpi.csv may be one listing (date,pv,inquiries,viewings,offers) or long format with
+`property_id` and optional `portal` / `broker` dimensions (several rows per day).
+"""
+import io, threading
+from contextlib import contextmanager
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+import pandas as pd
+
+KPI_COLS = {"date":["date","日付"],"pv":["pv","views","閲覧"],
+            "inq":["inquiries","inquiry","問合せ","問い合わせ"],
+            "view":["viewings","viewing","内覧"],
+            "offer":["offers","applications","申込","申し込み"]}
+DIM_COLS = {"property_id":["property_id","property","listing_id","listing","物件ID","物件"],
+            "portal":["portal","media","ポータル","媒体"],
+            "broker":["broker","agent","仲介","仲介会社"]}
+METRICS = ("pv","inquiries","viewings","offers")
+RATES = {"resp": ("inquiries","pv"), "view": ("viewings","inquiries"), "offer": ("offers","viewings")}
+DEFAULT_PROPERTY = "default"
+ENCODINGS = ["utf-8-sig","utf-8","cp932","shift_jis","mac_roman"]
+
+def normalize_kpi(df: pd.DataFrame):
+    """Raw CSV frame → (date, property_id[, portal, broker], metrics...) sorted by date; (None, error) on missing columns."""
+    cols = {str(c).lower(): c for c in df.columns}
+    def col_for(keys):
+        for k in keys:
+            if k.lower() in cols: return cols[k.lower()]
+        return None
+    c_date = col_for(KPI_COLS["date"]); c_pv = col_for(KPI_COLS["pv"])
+    c_inq = col_for(KPI_COLS["inq"]); c_view = col_for(KPI_COLS["view"]); c_offer = col_for(KPI_COLS["offer"])
+    miss = [name for name,c in [("date",c_date),("pv",c_pv),("inquiries",c_inq),("viewings",c_view),("offers",c_offer)] if c is None]
+    if miss:
+        return None, f"kpi.csv 列不足: {miss}"
+    out = pd.DataFrame({
+        "date": pd.to_datetime(df[c_date], errors="coerce"),
+        "pv": pd.to_numeric(df[c_pv], errors="coerce").fillna(0).astype(int),
+        "inquiries": pd.to_numeric(df[c_inq], errors="coerce").fillna(0).astype(int),
+        "viewings": pd.to_numeric(df[c_view], errors="coerce").fillna(0).astype(int),
+        "offers": pd.to_numeric(df[c_offer], errors="coerce").fillna(0).astype(int),
+    })
+    pos = 1
+    for dim, keys in DIM_COLS.items():
+        c = col_for(keys)
+        if c is not None:
+            out.insert(pos, dim, df[c].fillna("").astype(str).str.strip()); pos += 1
+        elif dim == "property_id":
+            out.insert(pos, dim, DEFAULT_PROPERTY); pos += 1
+    out = out.dropna(subset=["date"]).sort_values("date", kind="stable")
+    return out.reset_index(drop=True), None
+
+def property_summary(scope: pd.DataFrame, dims=("property_id",)) -> pd.DataFrame:
+    """Totals and conversion rates per property (or per dims) in one groupby."""
+    dims = [d for d in dims if d in scope.columns]
+    g = scope.groupby(dims, sort=True)[list(METRICS)].sum()
+    for name, (num, den) in RATES.items():
+        d = g[den].where(g[den] > 0)
+        g[name + "_rate"] = g[num] / d
+    g["days"] = scope.groupby(dims, sort=True)["date"].nunique()
+    return g.reset_index()
+
+# ===================== Prefix-sum rollup =====================
+EPOCH_ORDINAL = 719163   # date(1970, 1, 1).toordinal()
+
+def day_key(d) -> int:
+    return pd.Timestamp(d).toordinal()
+
+class KpiRollup:
+    """Cumulative sums over the sorted daily index.
+
+    totals(start, end) is two binary searches and a subtraction per metric;
+    append() extends it in O(1) for days at or after the last one.
+    """
+    def __init__(self):
+        self.days = []                            # sorted ordinals, one per day
+        self.cum = {m: [0] for m in METRICS}      # len(days) + 1
+
+    def __len__(self):
+        return len(self.days)
+
+    def append(self, day, pv=0, inquiries=0, viewings=0, offers=0):
+        k = day_key(day)
+        vals = (pv, inquiries, viewings, offers)
+        if self.days and k < self.days[-1]:
+            raise ValueError("out-of-order day; rebuild the rollup")
+        if self.days and k == self.days[-1]:
+            for m, v in zip(METRICS, vals):
+                self.cum[m][-1] += int(v)
+        else:
+            for m, v in zip(METRICS, vals):      # sums first: concurrent readers bound by len(days)
+                self.cum[m].append(self.cum[m][-1] + int(v))
+            self.days.append(k)
+
+    def extend(self, df: pd.DataFrame):
+        for r in df.itertuples(index=False):
+            self.append(r.date, r.pv, r.inquiries, r.viewings, r.offers)
+        return self
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        """Bulk build (date-sorted frame): daily sums + cumsum, no per-row Python."""
+        r = cls()
+        if df is None or df.empty:
+            return r
+        daily = df.groupby(df["date"].dt.normalize(), sort=True)[list(METRICS)].sum()
+        r.days = (daily.index.values.astype("datetime64[D]").astype("int64") + EPOCH_ORDINAL).tolist()
+        for m in METRICS:
+            r.cum[m] = [0] + daily[m].cumsum().tolist()
+        return r
+
+    def bounds(self, start=None, end=None):
+        lo = bisect_left(self.days, day_key(start)) if start is not None else 0
+        hi = bisect_right(self.days, day_key(end)) if end is not None else len(self.days)
+        return lo, max(lo, hi)
+
+    def totals(self, start=None, end=None):
+        """{'pv','inquiries','viewings','offers','first','last'} for start <= day <= end (inclusive)."""
+        lo, hi = self.bounds(start, end)
+        out = {m: self.cum[m][hi] - self.cum[m][lo] for m in METRICS}
+        out["first"] = pd.Timestamp.fromordinal(self.days[lo]) if hi > lo else None
+        out["last"] = pd.Timestamp.fromordinal(self.days[hi-1]) if hi > lo else None
+        return out
+
+# ===================== Incremental file store =====================
+class KpiStore:
+    """kpi.csv parsed once, then only appended bytes are parsed on refresh.
+
+    `rollup` covers the whole portfolio; `rollups[property_id]` each listing.
+
+    Anything but a pure append (same size with a new mtime, shrink, changed header or
+    changed bytes just before the last read offset) triggers a full reload. Only complete
+    lines are parsed: a last line without its newline waits for the next refresh.
+    """
+    PROBE = 256
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.version = 0
+        self._reset()
+
+    def _reset(self):
+        self.df = None; self.rollup = None; self.rollups = {}; self.enc = None; self.error = None
+        self._frames = {}
+        self.header = b""; self.offset = 0; self.probe = b""; self.mtime = None; self.size = 0
+
+    def _full_load(self, raw: bytes):
+        raw = raw[:raw.rfind(b"\n") + 1] or raw      # complete lines (a header-only file has none)
+        last_err = None
+        for enc in ENCODINGS:
+            try:
+                raw_df = pd.read_csv(io.BytesIO(raw), encoding=enc); break
+            except Exception as e:
+                last_err = e
+        else:
+            raise last_err
+        df, err = normalize_kpi(raw_df)
+        self.enc, self.error = enc, err
+        self.df = df
+        self._rebuild_rollups()
+        self.header = raw.split(b"\n", 1)[0] + b"\n"
+        self.offset = len(raw)
+
+    def _append(self, tail: bytes):
+        add, err = normalize_kpi(pd.read_csv(io.BytesIO(self.header + tail), encoding=self.enc))
+        if err or add.empty:
+            return
+        self.df = pd.concat([self.df, add], ignore_index=True)
+        groups = dict(tuple(add.groupby("property_id", sort=False)))
+        late = (self.rollup.days and day_key(add["date"].iloc[0]) < self.rollup.days[-1]) or any(
+            pid in self.rollups and self.rollups[pid].days and day_key(g["date"].iloc[0]) < self.rollups[pid].days[-1]
+            for pid, g in groups.items())
+        if late:
+            self.df = self.df.sort_values("date", kind="stable").reset_index(drop=True)
+            self._rebuild_rollups()
+        else:
+            self.rollup.extend(add)
+            for pid, g in groups.items():
+                self.rollups.setdefault(pid, KpiRollup()).extend(g)
+        self._frames = {}
+
+    def _rebuild_rollups(self):
+        self._frames = {}
+        if self.df is None:
+            self.rollup, self.rollups = None, {}; return
+        self.rollup = KpiRollup.from_frame(self.df)
+        self.rollups = {pid: KpiRollup.from_frame(g) for pid, g in self.df.groupby("property_id", sort=False)}
+
+    # ---- accessors ----
+    @contextmanager
+    def snapshot(self):
+        """`with store.snapshot() as (df, rollups):` one version across properties; refresh() waits for the block."""
+        with self.lock:
+            yield self.df, self.rollups
+
+    def properties(self):
+        return sorted(self.rollups)
+
+    def rollup_for(self, property_id=None):
+        return self.rollup if property_id is None else self.rollups.get(property_id)
+
+    def frame_for(self, property_id=None):
+        """Date-sorted rows of one property (cached per version), or all rows."""
+        df = self.df
+        if property_id is None or df is None:
+            return df
+        frames = self._frames
+        if property_id not in frames:
+            frames[property_id] = df[df["property_id"] == property_id].reset_index(drop=True)
+        return frames[property_id]
+
+    def refresh(self):
+        """Bring the store up to date with the file; returns self."""
+        with self.lock:
+            if not self.path.exists():
+                if self.mtime is not None: self.version += 1
+                self._reset(); return self
+            st = self.path.stat()
+            if self.mtime == st.st_mtime_ns and self.size == st.st_size:
+                return self
+            with self.path.open("rb") as f:
+                appended = False
+                # Appends only: the file grew and its header and last-read bytes are unchanged.
+                # Same size with a new mtime is an in-place edit → full reload.
+                if self.df is not None and st.st_size > self.size and f.read(len(self.header)) == self.header:
+                    f.seek(max(0, self.offset - self.PROBE))
+                    if f.read(min(self.offset, self.PROBE)) == self.probe:
+                        tail = f.read()
+                        cut = tail.rfind(b"\n") + 1          # complete lines only
+                        if cut:
+                            self._append(tail[:cut]); self.offset += cut
+                        appended = True
+                if not appended:
+                    f.seek(0); self._full_load(f.read())
+                f.seek(max(0, self.offset - self.PROBE))
+                self.probe = f.read(min(self.offset, self.PROBE))
+            self.mtime, self.size = st.st_mtime_ns, st.st_size
+            self.version += 1
+            return self
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Rolling-window conversion trends (7/14/28 days) and sparkline SVGs for the calm cards."""
+import threading
+from bisect import bisect_left
+from collections import deque
+from kpi_rollup import METRICS, RATES, day_key
+
+WINDOWS = (7, 14, 28)
+SPARK_POINTS = 60
+
+class RollingRates:
+    """Calendar-day window sums advanced one day at a time (O(1) amortized per day).
+
+    Consumes days from a KpiRollup; series[i] = {"resp","view","offer"} for days[i],
+    None where the denominator is 0.
+    """
+    def __init__(self, window):
+        self.window = window
+        self.q = deque()                       # [day, pv, inq, view, off]
+        self.sums = dict.fromkeys(METRICS, 0)
+        self.days, self.series = [], []
+        self.pos = 0                           # rollup days consumed
+
+    def _rates(self):
+        s = self.sums
+        return {k: (s[num] / s[den] if s[den] > 0 else None) for k, (num, den) in RATES.items()}
+
+    def _day_values(self, rollup, i):
+        return {m: rollup.cum[m][i+1] - rollup.cum[m][i] for m in METRICS}
+
+    def update(self, rollup):
+        # the last consumed day may have grown (several rows for the same day)
+        if self.pos and self.q and self.q[-1][0] == rollup.days[self.pos-1]:
+            vals = self._day_values(rollup, self.pos-1)
+            last = self.q[-1]
+            if any(vals[m] != last[1+j] for j, m in enumerate(METRICS)):
+                for j, m in enumerate(METRICS):
+                    self.sums[m] += vals[m] - last[1+j]; last[1+j] = vals[m]
+                self.series[-1] = self._rates()
+        n = len(rollup.days)
+        while self.pos < n:
+            day = rollup.days[self.pos]
+            vals = self._day_values(rollup, self.pos)
+            self.q.append([day] + [vals[m] for m in METRICS])
+            for m in METRICS:
+                self.sums[m] += vals[m]
+            while self.q[0][0] <= day - self.window:
+                old = self.q.popleft()
+                for j, m in enumerate(METRICS):
+                    self.sums[m] -= old[1+j]
+            self.days.append(day); self.series.append(self._rates())
+            self.pos += 1
+        return self
+
+    def since(self, start=None, end=None, limit=SPARK_POINTS):
+        lo = bisect_left(self.days, day_key(start)) if start is not None else 0
+        hi = bisect_left(self.days, day_key(end) + 1) if end is not None else len(self.days)
+        lo = max(lo, hi - limit)
+        return self.series[lo:hi]
+
+class TrendCache:
+    """RollingRates per (property, window), reused while the store keeps the same rollup object."""
+    def __init__(self, windows=WINDOWS):
+        self.windows = windows
+        self._lock = threading.Lock()
+        self._by_prop = {}                     # pid -> (rollup, {window: RollingRates})
+
+    def get(self, rollup, pid=None):
+        with self._lock:
+            hit = self._by_prop.get(pid)
+            if hit is None or hit[0] is not rollup:
+                hit = (rollup, {w: RollingRates(w) for w in self.windows})
+                self._by_prop[pid] = hit
+            for rr in hit[1].values():
+                rr.update(rollup)
+            return hit[1]
+
+# ===================== Sparklines =====================
+def sparkline_svg(values, width=52, height=18, color="#64748B"):
+    """Tiny inline SVG polyline; gaps (None) split the line."""
+    pts = [(i, v) for i, v in enumerate(values) if v is not None]
+    if len(pts) < 2:
+        return f'<svg width="{width}" height="{height}"></svg>'
+    lo = min(v for _, v in pts); hi = max(v for _, v in pts)
+    span = hi - lo
+    n = max(len(values) - 1, 1)
+    y = lambda v: (height - 2 - (v - lo) / span * (height - 4)) if span else height / 2
+    xy = lambda i, v: f"{i * (width - 2) / n + 1:.1f},{y(v):.1f}"
+    segs, cur = [], []
+    for i, v in enumerate(values):
+        if v is None:
+            if cur: segs.append(cur); cur = []
+        else:
+            cur.append(xy(i, v))
+    if cur: segs.append(cur)
+    lines = "".join(f'<polyline fill="none" stroke="{color}" stroke-width="1.2" points="{" ".join(s)}"/>' for s in segs if len(s) > 1)
+    ex, ey = xy(*pts[-1]).split(",")
+    return (f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}">{lines}'
+            f'<circle cx="{ex}" cy="{ey}" r="1.6" fill="{color}"/></svg>')
+
+def trend_strip_html(trends, kind, color="#64748B", start=None, end=None):
+    """Three sparklines (7/14/28d) for one rate kind, for the bottom of a KPI card."""
+    if not trends:
+        return ""
+    cells = []
+    for w, rr in trends.items():
+        vals = [p[kind] for p in rr.since(start, end)]
+        cells.append(f'<div style="text-align:center">{sparkline_svg(vals, color=color)}'
+                     f'<div style="font-size:10px; opacity:0.7">{w}d</div></div>')
+    return '<div style="display:flex; gap:6px; margin-top:6px">' + "".join(cells) + "</div>"
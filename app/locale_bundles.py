@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Locale bundles (checklists, risks, stage labels, UI strings, JP→EN dictionaries).
+
+Source of truth: app/locales/<code>.json (versioned). Each bundle is compiled to a
+marshal file under app/locales/__compiled__/ on first use and loaded lazily per
+language, once per process (Gradio handler threads share it).
+To add a locale: drop <code>.json next to ja.json and map its UI label in LANG_CODES.
+"""
+import json, marshal, os, re, threading
+from functools import lru_cache
+from pathlib import Path
+
+LOCALE_DIR = Path(__file__).resolve().parent / "locales"
+COMPILED_DIR = LOCALE_DIR / "__compiled__"
+COMPILED_FORMAT = 1
+LANG_CODES = {"日本語": "ja", "English": "en"}
+DEFAULT_LANG = "日本語"
+
+_lock = threading.Lock()
+
+def lang_code(lang: str) -> str:
+    return LANG_CODES.get(lang, lang if (LOCALE_DIR / f"{lang}.json").exists() else LANG_CODES[DEFAULT_LANG])
+
+def _compiled_path(code, version):
+    return COMPILED_DIR / f"{code}.v{version}.f{COMPILED_FORMAT}.marshal"
+
+def compile_bundle(code: str) -> Path:
+    """JSON → marshal (keeps the source mtime so stale files are detected)."""
+    src = LOCALE_DIR / f"{code}.json"
+    data = json.loads(src.read_text(encoding="utf-8"))
+    out = _compiled_path(code, data.get("version", 0))
+    COMPILED_DIR.mkdir(exist_ok=True)
+    tmp = out.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(marshal.dumps({"source_mtime_ns": src.stat().st_mtime_ns, "data": data}))
+    os.replace(tmp, out)
+    return out
+
+def _load(code):
+    src = LOCALE_DIR / f"{code}.json"
+    mtime = src.stat().st_mtime_ns
+    for p in COMPILED_DIR.glob(f"{code}.v*.f{COMPILED_FORMAT}.marshal") if COMPILED_DIR.exists() else []:
+        try:
+            blob = marshal.loads(p.read_bytes())
+        except Exception:
+            continue
+        if blob.get("source_mtime_ns") == mtime:
+            return blob["data"]
+    try:
+        return marshal.loads(compile_bundle(code).read_bytes())["data"]
+    except OSError:
+        return json.loads(src.read_text(encoding="utf-8"))   # read-only install
+
+@lru_cache(maxsize=None)
+def _bundle(code):
+    with _lock:
+        return _load(code)
+
+def bundle(lang: str) -> dict:
+    """Bundle for a UI language label ("日本語"/"English") or locale code ("ja"/"en")."""
+    return _bundle(lang_code(lang))
+
+def ui_strings(lang: str) -> dict:
+    return bundle(lang)["ui"]
+
+def reload_bundles():
+    _bundle.cache_clear(); _glossary.cache_clear(); _reverse_glossary.cache_clear()
+
+# ===================== JP→EN translation =====================
+def compile_glossary(glossary: dict):
+    """One alternation regex equivalent to replacing keys longest-first, one key at a time.
+
+    A higher-priority key overlapping the tail of a lower one wins under that order,
+    so each key gets negative lookaheads for those keys at the overlap positions.
+    """
+    order = sorted(glossary.keys(), key=len, reverse=True)
+    pats = {}
+    for i, k in enumerate(order):
+        guards = {}
+        for h in order[:i]:
+            for n in range(1, min(len(k), len(h))):
+                if k[-n:] == h[:n]:
+                    guards.setdefault(len(k) - n, []).append(pats[h])
+        p, prev = "", 0
+        for pos in sorted(guards):
+            p += re.escape(k[prev:pos]) + "(?!" + "|".join(guards[pos]) + ")"
+            prev = pos
+        pats[k] = p + re.escape(k[prev:])
+    return re.compile("|".join(pats[k] for k in order)) if order else None
+
+@lru_cache(maxsize=None)
+def _glossary():
+    en = bundle("en")
+    return en["jp2en"], en["glossary"], compile_glossary(en["glossary"])
+
+PUNCT_EN = str.maketrans({"（": "(", "）": ")", "・": "/", "　": " "})
+
+def localize_text(text: str, lang: str) -> str:
+    """Return EN translation for common JP phrases; use substring glossary if needed."""
+    s = str(text)
+    if lang == "日本語":
+        return s
+    jp2en, glossary, rx = _glossary()
+    # exact match first
+    if s in jp2en:
+        t = jp2en[s]
+    elif rx is not None:
+        # substring glossary in a single pass (longer keys first)
+        t = rx.sub(lambda m: glossary[m.group(0)], s)
+    else:
+        t = s
+    # normalize punctuation/spaces
+    return t.translate(PUNCT_EN).strip()
+
+JA_SCRIPT_RE = re.compile(r"[ぁ-んァ-ヶ一-龥々〆]")
+UNTRANSLATED = "(untranslated)"
+
+def english_text(original: str, rendered: str):
+    """(text, translated): the glossary rendering if no Japanese is left in it, else the original."""
+    if rendered and not JA_SCRIPT_RE.search(rendered):
+        return rendered, True
+    return str(original), False
+
+# ===================== EN→JP query expansion =====================
+@lru_cache(maxsize=None)
+def _reverse_glossary():
+    """English phrase (lowercase) → Japanese originals, from jp2en and the glossary."""
+    jp2en, glossary, _ = _glossary()
+    rev = {}
+    for ja, en in list(jp2en.items()) + list(glossary.items()):
+        rev.setdefault(str(en).lower().strip(), []).append(ja)
+    keys = sorted((k for k in rev if k), key=len, reverse=True)
+    rx = re.compile(r"(?<![a-z0-9])(?:" + "|".join(re.escape(k) for k in keys) + r")(?![a-z0-9])") if keys else None
+    return rev, rx
+
+def en_to_ja_terms(text: str):
+    """Japanese terms whose English translation appears in `text` (for cross-lingual search)."""
+    rev, rx = _reverse_glossary()
+    if rx is None or not re.search(r"[A-Za-z]", str(text)):
+        return []
+    out = []
+    for m in rx.finditer(str(text).lower()):
+        out.extend(rev[m.group(0)])
+    return out
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""Non-UI core of the PMO app: event/KPI loading, ranking, packs and evidence routing.
+
+Shared by app.py (Gradio UI) and api.py (JSON API); importing it does not load Gradio.
+"""
+import datetime as dt
+from pathlib import Path
+import pandas as pd
+from locale_bundles import bundle, localize_text
+from kpi_rollup import KpiStore
+from kpi_trends import TrendCache
+from kpi_alerts import CalmAlerts
+from evidence_index import BACKEND as EVIDENCE_BACKEND, load_routes
+
+# ===================== Common helpers =====================
+ENCODINGS = ["utf-8-sig","utf-8","cp932","shift_jis","mac_roman"]
+
+def read_csv_flex(path: Path):
+    last_err = None
+    for enc in ENCODINGS:
+        try:
+            return pd.read_csv(path, encoding=enc), enc
+        except Exception as e:
+            last_err = e
+    raise last_err
+
+# ===================== Domain knowledge =====================
+# Stages and compass
+STAGES = ["Prep","Listing","Viewing","Offer","Finance","Close"]
+
+def make_compass(row, lang="日本語"):
+    import pandas as pd
+    cat = str(row.get("category",""))
+    desc = str(row.get("description",""))
+    date_dt = row.get("date_dt") or pd.to_datetime(row.get("date"))
+    try:
+        pos = f"{STAGES.index(cat)+1}/{len(STAGES)}"
+    except ValueError:
+        pos = "–/–"
+    when = pd.Timestamp(date_dt).date().isoformat()
+    b = bundle(lang)
+    stage = b["stage"].get(cat, cat)
+    nxt = b["next_hint"].get(cat, b["next_hint_default"])
+    if lang == "日本語":
+        return f"旅路 {pos}｜{stage}。{when} に『{desc}』— 次は {nxt}。"
+    else:
+        desc_en = row_en(row, "description")
+        return f"Journey {pos} | {stage}. On {when}: “{desc_en}”. Next: {nxt}."
+
+def row_en(row, col):
+    """Pre-translated `<col>_en` column when present (see load_events), else translate now."""
+    v = row.get(col + "_en")
+    return v if isinstance(v, str) else localize_text(row.get(col, ""), "English")
+
+# ===================== Data loaders =====================
+EN_COLS = ["description","expected_action","success_criteria"]
+_EVENTS_CACHE = {}   # path -> ((mtime_ns, size), df)
+
+def file_sig(p: Path):
+    st = p.stat()
+    return (st.st_mtime_ns, st.st_size)
+
+def data_version(p: Path):
+    """file_sig, or None when the file is missing (single-flight keys)."""
+    try:
+        return file_sig(p)
+    except OSError:
+        return None
+
+def add_en_columns(df):
+    """Add `<col>_en` for EN_COLS, translating each distinct string once."""
+    for c in EN_COLS:
+        src = df[c].astype(str)
+        df[c + "_en"] = src.map({s: localize_text(s, "English") for s in src.unique()})
+    return df
+
+EVENTS_PATH = Path(__file__).resolve().parents[1] / "data" / "events_sample.csv"
+
+def load_events():
+    """Parsed events (+ English columns), cached until the CSV changes. Treat as read-only."""
+    p = EVENTS_PATH
+    sig = file_sig(p)
+    hit = _EVENTS_CACHE.get(p)
+    if hit and hit[0] == sig:
+        return hit[1]
+    df, enc = read_csv_flex(p)
+    expected = ["event_id","date","actor","category","description","expected_action","success_criteria","risk_level"]
+    miss = [c for c in expected if c not in df.columns]
+    if miss:
+        raise ValueError(f"CSV列不足: {miss}")
+    df["date_dt"] = pd.to_datetime(df["date"], errors="coerce")
+    if df["date_dt"].isna().any():
+        df.loc[df["date_dt"].isna(),"date_dt"] = pd.to_datetime(df.loc[df["date_dt"].isna(),"date"], format="%Y/%m/%d", errors="coerce")
+    if df["date_dt"].isna().any():
+        bad = df[df["date_dt"].isna()]["date"].unique().tolist()
+        raise ValueError(f"日付を解釈できません（YYYY-MM-DD / YYYY/MM/DD）: {bad}")
+    add_en_columns(df)
+    _EVENTS_CACHE[p] = (sig, df)
+    return df
+
+def contact_row(actor):
+    p = Path(__file__).resolve().parents[1] / "data" / "contacts.csv"
+    if p.exists():
+        try:
+            df, _ = read_csv_flex(p)
+            rows = df[df["actor"]==actor]
+            if not rows.empty:
+                return rows.iloc[0].to_dict()
+        except Exception:
+            pass
+    return {}
+
+def contacts_lookup(actor):
+    r = contact_row(actor)
+    return r.get("to",""), r.get("cc",""), r.get("attachments","")
+
+def chat_channel(actor):
+    """Optional `channel` column in contacts.csv; falls back to PMO_CHAT_CHANNEL."""
+    ch = contact_row(actor).get("channel")
+    return str(ch) if isinstance(ch, str) and ch.strip() else None
+
+# ===================== ICS helpers =====================
+def ics_escape(s: str) -> str:
+    s = s.replace("\\", "\\\\").replace(";", r"\;").replace(",", r"\,")
+    s = s.replace("\r\n", r"\n").replace("\n", r"\n")
+    return s
+
+def fold_ics_line(name: str, value: str) -> str:
+    raw = f"{name}:{value}"
+    out = []
+    while len(raw) > 73:
+        out.append(raw[:73])
+        raw = " " + raw[73:]
+    out.append(raw)
+    return "\r\n".join(out)
+
+def ics_text(event_id, title, date_iso, description=""):
+    """All-day VEVENT (with a 1-day reminder) as CRLF text."""
+    start = pd.to_datetime(date_iso).strftime("%Y%m%d")
+    end = (pd.to_datetime(date_iso) + pd.Timedelta(days=1)).strftime("%Y%m%d")
+    summary = ics_escape(title); desc = ics_escape(description)
+    lines = [
+        "BEGIN:VCALENDAR","VERSION:2.0","PRODID:-//SellPM//PMOPlus//JP","BEGIN:VEVENT",
+        f"UID:{event_id}@sellpm",
+        f"DTSTAMP:{pd.Timestamp.utcnow().strftime('%Y%m%dT%H%M%SZ')}",
+        f"DTSTART;VALUE=DATE:{start}", f"DTEND;VALUE=DATE:{end}",
+        fold_ics_line("SUMMARY", summary), fold_ics_line("DESCRIPTION", desc) if desc else "DESCRIPTION:",
+        "BEGIN:VALARM","TRIGGER:-P1D","ACTION:DISPLAY","DESCRIPTION:Reminder","END:VALARM",
+        "END:VEVENT","END:VCALENDAR",
+    ]
+    return "\r\n".join(lines)
+
+# ===================== KPI (Calm mode) =====================
+THRESHOLDS = {
+    "resp_green": 0.06, "resp_yellow": 0.03,
+    "view_green": 0.35, "view_yellow": 0.20,
+    "offer_green": 0.15, "offer_yellow": 0.08,
+}
+
+def calm_level(value, kind, alert=None):
+    """'green' / 'yellow' / 'red' by THRESHOLDS for `value` ('none' without data).
+
+    `alert` (7-day baseline detector) can only soften: red stays red only when it confirms a
+    sustained drop. It never recolours a rate from another range; show it as its own badge.
+    """
+    if value is None or kind not in ("resp","view","offer"):
+        return "none"
+    if value >= THRESHOLDS[f"{kind}_green"]: level = "green"
+    elif value >= THRESHOLDS[f"{kind}_yellow"]: level = "yellow"
+    else: level = "red"
+    if alert is False and level == "red":
+        level = "yellow"   # below the fixed line but normal for this listing: stay calm
+    return level
+
+KPI_STORE = KpiStore(Path(__file__).resolve().parents[1] / "data" / "kpi.csv")
+KPI_TRENDS = TrendCache()   # rolling 7/14/28-day rates per property, advanced as days arrive
+KPI_ALERTS = CalmAlerts()   # EWMA baseline per property/rate, fed from the 7-day series
+
+def read_kpi():
+    store = KPI_STORE.refresh()
+    if store.df is None:
+        return None, (store.error or "kpi.csv がありません（data/kpi.csv を作成してください）")
+    return store.df, store.enc
+
+# ===================== Range / scope choices =====================
+CHOICES_ACTION = ["今日以降 / From today", "すべて / All"]
+CHOICES_KPI    = ["直近30日 / Last 30 days", "今月 / This month", "すべて / All"]
+
+def is_from_today(val: str) -> bool:
+    return ("今日以降" in val) or ("From today" in val)
+
+def norm_kpi_range(val: str) -> str:
+    if ("直近30日" in val) or ("Last 30" in val): return "30"
+    if ("今月" in val) or ("This month" in val): return "month"
+    return "all"
+
+def kpi_range_bounds(range_mode, today=None):
+    """(start, end) for a KPI range choice; None = open-ended. Custom ranges: pass (start, end)."""
+    if isinstance(range_mode, (tuple, list)):
+        return tuple(pd.Timestamp(x) if x is not None else None for x in range_mode)
+    today = pd.Timestamp(today or dt.date.today())
+    key = norm_kpi_range(range_mode)
+    if key == "30":
+        return today - pd.Timedelta(days=30), None
+    if key == "month":
+        return pd.Timestamp(today.year, today.month, 1), None
+    return None, None
+
+# ===================== Evidence routing =====================
+def support_query(event_row, lang="日本語"):
+    if lang == "日本語":
+        return " ".join([str(event_row.get("category","")), str(event_row.get("description","")), str(event_row.get("expected_action",""))])
+    return " ".join([str(event_row.get("category","")), row_en(event_row, "description"), row_en(event_row, "expected_action")])
+
+EVIDENCE_ROUTES = load_routes()
+
+def support_route(event_row):
+    return EVIDENCE_ROUTES.get(str(event_row.get("category","")).strip())
+
+# ===================== Core logic =====================
+def priority_score(row):
+    risk_map = {"Low":1,"Medium":2,"High":3}
+    risk = risk_map.get(str(row["risk_level"]), 2)
+    days = max((row["date_dt"].date() - dt.date.today()).days, 0)
+    time_factor = max(0.2, 1.0 - (days/60.0))
+    return round(risk * 33 * time_factor)
+
+def rank_actions(df, mode_selected):
+    """In-scope events with `priority`, highest first (empty frame when nothing is in scope)."""
+    today = dt.date.today()
+    scope = df[df["date_dt"]>=pd.Timestamp(today)] if is_from_today(mode_selected) else df
+    if scope.empty:
+        return pd.DataFrame()
+    tmp = scope.copy()
+    tmp["priority"] = tmp.apply(priority_score, axis=1)
+    return tmp.sort_values(["priority","date_dt","risk_level"], ascending=[False,True,True])
+
+def pack_parts(row, lang):
+    """Pack contents as data: subject / email / chat / text / checklist / risks / compass / ics (no side effects besides the contacts lookup)."""
+    actor = str(row["actor"]); cat = str(row["category"])
+    date_dt = row.get("date_dt") or pd.to_datetime(row.get("date"))
+    date = pd.Timestamp(date_dt).date().isoformat()
+    desc = str(row["description"]); exp = str(row["expected_action"]); suc = str(row["success_criteria"])
+    due48 = (pd.Timestamp(date_dt).date() - pd.Timedelta(days=2)).isoformat()
+
+    # Journey compass
+    compass = make_compass(row, lang)
+
+    # Checklist & risks (by lang)
+    b = bundle(lang)
+    checklist = b["checklists"].get(cat, b["checklist_default"])
+    risks = b["risks"].get(cat, b["risks_default"])
+
+    to, cc, attach = contacts_lookup(actor)
+
+    if lang=="日本語":
+        subject = f"{cat} / {desc[:18]}… 進行のお願い（{date} まで）"
+        body = f"""件名: {subject}
+To: {to or '＜宛先メール＞'}
+Cc: {cc or '＜共有者＞'}
+
+{actor} 各位
+※ {compass}
+以下のとおりご対応をお願いします。
+- 目的: {desc}
+- 依頼: {exp}
+- 期限: {date}（可能であれば {due48} までの事前確認）
+- 完了条件: {suc}
+- 参考: チェックリスト（下記）／想定リスク（下記）
+添付: {attach or '＜必要資料＞'}
+
+PMO"""
+        slack = f"[{cat}] {desc} → {exp} ｜期限 {date}（事前確認 {due48}）｜担当 {actor}"
+        header = "旅路コンパス\n" + compass + "\n\n" + "チェックリスト\n- " + "\n- ".join(checklist)
+        risksec = "\n\nリスク/確認\n- " + "\n- ".join(risks)
+        out_text = header + risksec + "\n\nメール文例（コピー可）\n" + body + "\n\nSlack/チャット用短文\n" + slack
+        memo = f"{cat} | 目的: {desc}\\n依頼: {exp}\\n完了条件: {suc}\\n担当: {actor}\\n事前確認: {due48}\\n旅路: {compass}"
+    else:
+        desc_en = row_en(row, "description")
+        exp_en  = row_en(row, "expected_action")
+        suc_en  = row_en(row, "success_criteria")
+
+        subject = f"{cat} — action needed by {date}: {desc_en[:32]}"
+        body = f"""Subject: {subject}
+To: {to or '<recipient>'}
+Cc: {cc or '<stakeholders>'}
+
+Dear {actor},
+* {compass}
+Please proceed as follows:
+- Goal: {desc_en}
+- Action: {exp_en}
+- Deadline: {date} (early check by {due48})
+- Done: {suc_en}
+- Ref: Checklist (below) / Risks (below)
+Attachments: {attach or '<attachments>'}
+
+PMO"""
+        slack = f"[{cat}] {desc_en} → {exp_en} | due {date} (precheck {due48}) | owner {actor}"
+        header = "Journey compass\n" + compass + "\n\n" + "Checklist\n- " + "\n- ".join(checklist)
+        risksec = "\n\nRisks / Checks\n- " + "\n- ".join(risks)
+        out_text = header + risksec + "\n\nEmail Draft\n" + body + "\n\nChat Snippet\n" + slack
+        memo = f"{cat} | Goal: {desc_en}\\nAction: {exp_en}\\nDone: {suc_en}\\nOwner: {actor}\\nPrecheck: {due48}\\nJourney: {compass}"
+
+    return {"event_id": str(row["event_id"]), "category": cat, "actor": actor, "date": date, "precheck": due48,
+            "compass": compass, "checklist": list(checklist), "risks": list(risks),
+            "to": to or "", "cc": cc or "", "attachments": attach or "",
+            "subject": subject, "email": body, "chat": slack, "text": out_text,
+            "ics": ics_text(str(row["event_id"]), f"{cat}: {desc}", date, description=memo)}
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Single-flight: concurrent calls with the same key share one execution and its result.
+
+Not a cache — once the leader finishes, the next call with that key runs again. Keys
+should carry the data version (e.g. the CSV's mtime/size) so a change never joins a
+computation started on older data.
+"""
+import copy, threading
+from collections import Counter
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = self.error = None
+
+class CoalescedError(RuntimeError):
+    """Raised in a follower when the shared execution failed and its exception could not be copied."""
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}                  # key -> _Call in flight
+        self._stats = Counter()           # calls / executions / coalesced / errors (every failed caller), plus per-name ":" variants
+
+    def do(self, key, fn, *args, **kwargs):
+        """fn(*args, **kwargs) once per in-flight key; followers wait and get the same result (or exception).
+
+        key[0] (if a tuple) is used as the name in the per-name counters.
+        """
+        name = key[0] if isinstance(key, tuple) and key else key
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            kind = "executions" if leader else "coalesced"
+            self._stats.update(("calls", kind, f"{name}:{kind}"))
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                with self._lock:
+                    self._stats.update(("errors",))
+                raise self._own_copy(call.error) from call.error
+            return call.result
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._stats.update(("errors",))
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    @staticmethod
+    def _own_copy(error):
+        """A per-caller copy of the leader's exception, so concurrent raises don't share __traceback__."""
+        try:
+            err = copy.copy(error)
+        except Exception:
+            return CoalescedError(repr(error))
+        err.__traceback__ = err.__cause__ = err.__context__ = None
+        return err
+
+    def stats(self):
+        """{'calls', 'executions', 'coalesced', 'errors', 'coalesced_rate', 'in_flight', 'by_name': {name: {...}}}"""
+        with self._lock:
+            s, in_flight = dict(self._stats), len(self._calls)
+        by_name = {}
+        for k, v in s.items():
+            if ":" in k:
+                name, kind = k.rsplit(":", 1)
+                by_name.setdefault(name, {"executions": 0, "coalesced": 0})[kind] = v
+        calls = s.get("calls", 0)
+        return {"calls": calls, "executions": s.get("executions", 0), "coalesced": s.get("coalesced", 0),
+                "errors": s.get("errors", 0), "coalesced_rate": (s.get("coalesced", 0) / calls) if calls else None,
+                "in_flight": in_flight, "by_name": by_name}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
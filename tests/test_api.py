@@ -0,0 +1,49 @@
+import subprocess, sys
+from pathlib import Path
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+import api
+
+ROOT = Path(__file__).resolve().parents[1]
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(api.api)
+
+def test_actions_are_ranked_and_limited(client):
+    r = client.get("/actions", params={"scope": "all", "k": 3, "lang": "en"})
+    assert r.status_code == 200
+    acts = r.json()["actions"]
+    assert len(acts) == 3 and [a["priority"] for a in acts] == sorted((a["priority"] for a in acts), reverse=True)
+
+def test_pack_and_ics(client):
+    eid = client.get("/actions", params={"scope": "all", "k": 1}).json()["actions"][0]["event_id"]
+    pack = client.get(f"/pack/{eid}", params={"evidence": True}).json()
+    assert pack["event_id"] == eid and pack["checklist"] and isinstance(pack["evidence"], list)
+    ics = client.get(f"/pack/{eid}/ics")
+    assert ics.headers["content-type"].startswith("text/calendar") and ics.text.startswith("BEGIN:VCALENDAR")
+    assert client.get("/pack/NO-SUCH-EVENT").status_code == 404
+
+def test_kpi_totals_match_the_csv(client):
+    want = pd.read_csv(ROOT / "data" / "kpi.csv")[["pv", "inquiries", "viewings", "offers"]].sum().to_dict()
+    body = client.get("/kpi", params={"range": "all"}).json()
+    assert body["totals"] == {k: int(v) for k, v in want.items()}
+    assert set(body["levels"]) == {"resp", "view", "offer"}
+    props = client.get("/kpi/properties", params={"range": "all"}).json()["properties"]
+    assert sum(p["pv"] for p in props) == want["pv"]
+
+def test_evidence_search(client):
+    body = client.get("/evidence", params={"q": "内覧 鍵", "k": 2, "lang": "en"}).json()
+    assert 0 < len(body["results"]) <= 2
+    assert all({"text", "text_ja", "translated"} <= set(r) for r in body["results"])
+
+@pytest.mark.parametrize("url", ["/actions?scope=week", "/kpi?range=7", "/kpi?start=2025-09-10&end=2025-09-01",
+                                 "/kpi?start=notadate", "/evidence?q=x&backend=nope", "/evidence?q=x&lang=fr"])
+def test_invalid_parameters_are_422(client, url):
+    assert client.get(url).status_code == 422
+
+def test_importing_the_api_does_not_load_gradio():
+    code = "import sys, api; print('gradio' in sys.modules, 'app' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT / "app", capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["False", "False"]
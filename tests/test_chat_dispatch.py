@@ -0,0 +1,76 @@
+import functools, json, socket, threading, time
+import pytest
+import chat_dispatch
+from chat_dispatch import ChatDispatcher, run_stub
+
+def _stub(status):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0)); port = s.getsockname()[1]
+    threading.Thread(target=run_stub, args=(port, status), daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.1).close()
+            return f"http://127.0.0.1:{port}/"
+        except OSError:
+            time.sleep(0.02)
+    raise RuntimeError("stub did not start")
+
+def _wait(cond, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not cond() and time.monotonic() < end:
+        time.sleep(0.02)
+    return cond()
+
+def _queue(path):
+    return [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines()] if path.exists() else []
+
+@pytest.fixture(scope="module")
+def ok_url():
+    return _stub(200)
+
+def test_batches_and_coalesces_per_channel(ok_url, tmp_path, capsys):
+    d = ChatDispatcher(ok_url, batch_window=0.1, queue_path=tmp_path / "q.jsonl").start()
+    for text in ["a", "b", "a", "a"]:
+        d.submit("#x", text)
+    assert _wait(lambda: d.stats["sent"] == 1)
+    d.stop()
+    assert d.stats["submitted"] == 4 and d.stats["coalesced"] == 2
+    assert json.loads(capsys.readouterr().out.split(" ", 1)[1]) == {"channel": "#x", "text": "a (×3)\nb"}
+    assert _queue(tmp_path / "q.jsonl") == []
+
+def test_429_is_requeued_with_backoff_and_retried_after_restart(ok_url, tmp_path):
+    q = tmp_path / "q.jsonl"
+    d = ChatDispatcher(_stub(429), batch_window=0.05, queue_path=q, retry_interval=60).start()
+    d.submit("#x", "hello")
+    assert _wait(lambda: d.stats["failed"] == 1)
+    d.stop()
+    assert d.bucket.blocked_until > time.monotonic() + 3          # Retry-After: 5 from the stub
+    (item,) = _queue(q)
+    assert item["payload"] == {"channel": "#x", "text": "hello"} and item["attempts"] == 1
+    assert item["next_at"] > time.time() + 50
+    item["next_at"] = 0
+    q.write_text(json.dumps(item) + "\n", encoding="utf-8")
+    d2 = ChatDispatcher(ok_url, queue_path=q, retry_interval=0.05).start()
+    assert _wait(lambda: d2.stats["sent"] == 1)
+    d2.stop()
+    assert _queue(q) == []
+
+def test_unflushed_batches_are_saved_and_sent_on_the_next_start(ok_url, tmp_path):
+    q = tmp_path / "q.jsonl"
+    d = ChatDispatcher(ok_url, batch_window=60, queue_path=q).start()
+    d.submit("#x", "a"); d.submit("#x", "a")
+    assert _wait(lambda: _queue(q) == [{"channel": "#x", "batch": {"a": 2}}])
+    d2 = ChatDispatcher(ok_url, queue_path=q)               # as after a crash of `d`
+    assert d2._retry == [{"payload": {"channel": "#x", "text": "a (×2)"}, "attempts": 0, "next_at": 0}]
+    d.stop()
+
+def test_url_change_stops_the_previous_dispatcher(ok_url, tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_dispatch, "ChatDispatcher", functools.partial(ChatDispatcher, queue_path=tmp_path / "q.jsonl"))
+    monkeypatch.setattr(chat_dispatch, "_dispatcher", None)
+    monkeypatch.setenv(chat_dispatch.WEBHOOK_ENV, ok_url)
+    first = chat_dispatch.get_dispatcher()
+    thread = first._thread
+    monkeypatch.setenv(chat_dispatch.WEBHOOK_ENV, ok_url + "other")
+    second = chat_dispatch.get_dispatcher()
+    assert second is not first and not thread.is_alive() and first._loop is None
+    second.stop()
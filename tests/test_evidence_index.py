@@ -0,0 +1,79 @@
+import json, os, random
+import pytest
+from evidence_bench import expand_corpus, load_seeds, make_queries
+from evidence_index import BACKENDS, EvidenceIndex, get_index
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    rng = random.Random(3)
+    seeds = load_seeds()
+    src = tmp_path_factory.mktemp("ev") / "chunks.jsonl"
+    src.write_text("".join(json.dumps(c, ensure_ascii=False) + "\n" for c in expand_corpus(seeds, 300, rng)), encoding="utf-8")
+    index = EvidenceIndex.build(src)
+    queries = [index.tokenize(q) for q, *_ in make_queries(seeds, 40, rng)]
+    return index, queries
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_sparse_and_dense_blocks_rank_the_same(corpus, backend):
+    index, queries = corpus
+    ip, docs, w = index._posting_weights(backend)
+    block = [index._query_weights(q, backend, ip) for q in queries]
+    sparse = index._score_block(block, ip, docs, w, 5, dense=False)
+    dense = index._score_block(block, ip, docs, w, 5, dense=True)
+    assert [[d for _, d in r] for r in sparse] == [[d for _, d in r] for r in dense]
+    assert all(a == pytest.approx(b) for rs, rd in zip(sparse, dense) for (a, _), (b, _) in zip(rs, rd))
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_partition_equals_global_results_filtered_by_tag(corpus, backend):
+    index, queries = corpus
+    tags = frozenset({"viewing_flow"})
+    part = index._search_ids(queries, 3, backend, tags)
+    full = index._search_ids(queries, index.size, backend)
+    for p, f in zip(part, full):
+        want = [d for _, d in f if index.doc_tags[d] in tags][:3]
+        assert [d for _, d in p] == want
+
+def test_saved_index_loads_without_pickle_and_ranks_the_same(corpus, tmp_path):
+    index, queries = corpus
+    path = tmp_path / "chunks.jsonl.idx"
+    index.save(path)
+    loaded = EvidenceIndex.load(path, index.source)
+    assert loaded.vocab == index.vocab and loaded.doc_tags == index.doc_tags and loaded.analyzer == index.analyzer
+    for backend in BACKENDS:
+        assert loaded._search_ids(queries, 5, backend) == index._search_ids(queries, 5, backend)
+
+def _postings(index):
+    ip, docs, tfs = index.indptr, index.docs, index.tfs
+    return {tok: list(zip(docs[ip[t]:ip[t+1]], tfs[ip[t]:ip[t+1]])) for tok, t in index.vocab.items()}
+
+def test_incremental_updates_equal_a_full_rebuild(corpus, tmp_path, monkeypatch):
+    index, queries = corpus
+    appends, appended = [], EvidenceIndex.appended
+    monkeypatch.setattr(EvidenceIndex, "appended", lambda self: appends.append(appended(self)) or appends[-1])
+    lines = index.source.read_bytes().splitlines(keepends=True)[:120]
+    src, ref = tmp_path / "chunks.jsonl", tmp_path / "ref" / "chunks.jsonl"    # own sidecar for the rebuild
+    ref.parent.mkdir()
+    steps = [b"".join(lines[:40]),
+             b"".join(lines[:70]),                       # append
+             b"".join(lines[:70]) + lines[70][:25],      # line still being written
+             b"".join(lines[:100]),                      # ... completed, more appended
+             b"".join(lines[:55]),                       # shrink
+             b"".join(lines[:120])]
+    for t, data in enumerate(steps, 1):
+        src.write_bytes(data); ref.write_bytes(data)
+        os.utime(src, ns=(t * 10**9, t * 10**9))
+        live, full = get_index(src), EvidenceIndex.build(ref)
+        assert (live.offsets, live.doc_len, live.doc_tags, live.end) == (full.offsets, full.doc_len, full.doc_tags, full.end), t
+        assert _postings(live) == _postings(full), t
+        for backend in BACKENDS:
+            assert live._search_ids(queries, 5, backend) == full._search_ids(queries, 5, backend), t
+    assert [a is not None for a in appends] == [True, True, True, False, True]   # only the shrink rebuilds
+
+def test_vectorized_query_ranks_like_the_reference_bm25_search(corpus):
+    index, queries = corpus
+    batch = index.search_batch(queries, 5, "bm25")        # > DENSE_BLOCK queries: dense blocks
+    for q, b in zip(queries, batch):
+        ref = index.search(q, 5)
+        for got in (index.query(q, 5, "bm25"), b):
+            assert [c["id"] for _, c in got] == [c["id"] for _, c in ref]
+            assert [s for s, _ in got] == pytest.approx([s for s, _ in ref])
@@ -0,0 +1,15 @@
+import pandas as pd
+from funnel_projection import OfferProjection
+from kpi_rollup import KpiRollup
+
+def _rollup(days, pv, inq, view, off):
+    r = KpiRollup()
+    for d in pd.date_range("2025-08-01", periods=days):
+        r.append(d, pv, inq, view, off)
+    return r
+
+def test_portfolio_batch_matches_single_projection():
+    rollups = {f"P{i:03d}": _rollup(20 + i, 40 + 5 * i, 2 + i % 3, 1, 0) for i in range(7)}
+    batch = OfferProjection(sims=500).portfolio(rollups, batch=4)
+    single = OfferProjection(sims=500)
+    assert batch == {pid: single.get(pid, r) for pid, r in rollups.items()}
@@ -0,0 +1,55 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from evidence_index import EvidenceIndex
+from ingest_notes import append_jsonl, file_chunks, pack_chunks, pooled_chunks, split_sentences
+
+EN = ("Confirm the viewing slots before the weekend. Keys must be collected from the management office "
+      "in advance. Share the 3.5 hour window with the agent (see p.12). Is the lobby notice approved? "
+      "Photos of the shared facilities need permission")
+
+def test_english_paragraph_splits_into_sentences():
+    assert list(split_sentences(EN)) == [
+        "Confirm the viewing slots before the weekend.",
+        "Keys must be collected from the management office in advance.",
+        "Share the 3.5 hour window with the agent (see p.12).",
+        "Is the lobby notice approved?",
+        "Photos of the shared facilities need permission",
+    ]
+
+def test_english_chunks_end_on_sentence_boundaries():
+    chunks = [t for _, _, t in pack_chunks([(1, "", EN)], max_chars=80, min_chars=10)]
+    assert len(chunks) > 1 and all(len(c) <= 80 for c in chunks)
+    assert all(c.endswith((".", "?", "permission")) for c in chunks)
+
+def test_japanese_sentences_keep_closing_brackets():
+    assert list(split_sentences("内覧は鍵を確認。掲示は要確認！「了解。」次へ")) == ["内覧は鍵を確認。", "掲示は要確認！", "「了解。」", "次へ"]
+
+def test_append_swaps_in_a_copy_and_the_index_still_catches_up(tmp_path):
+    src = tmp_path / "chunks.jsonl"
+    src.write_text(json.dumps({"id": "A", "tag": "viewing_flow", "text": "内覧の鍵を事前に受け取る"}, ensure_ascii=False), encoding="utf-8")
+    old = EvidenceIndex.build(src)
+    ino = src.stat().st_ino
+    assert append_jsonl([{"id": "B", "tag": "offer_terms", "text": "申込条件を整理する"}], src) == 1
+    assert src.stat().st_ino != ino and src.read_bytes().count(b"\n") == 2
+    assert old.chunks[0]["id"] == "A"                  # the old mapping still reads its own inode
+    new = old.appended()
+    assert new is not None and [c["id"] for c in new.chunks] == ["A", "B"]
+    assert append_jsonl([], src) == 0 and not list(tmp_path.glob("*.tmp"))
+
+def test_pooled_chunks_keeps_file_order_within_a_bounded_window(tmp_path):
+    files = []
+    for i in range(12):
+        f = tmp_path / f"n{i:02d}.md"
+        f.write_text("\n\n".join(f"内覧 {i}-{j} の鍵を確認する。" for j in range(i + 1)), encoding="utf-8")
+        files.append(f)
+    submitted, yielded, peak = [], 0, 0
+    class Pool(ThreadPoolExecutor):
+        def submit(self, *a, **kw):
+            submitted.append(a[1])
+            return super().submit(*a, **kw)
+    with Pool(3) as pool:
+        out = []
+        for chunks in pooled_chunks(pool, files, 180, 20, window=4):
+            peak = max(peak, len(submitted) - yielded)
+            out.append(chunks); yielded += 1
+    assert out == [file_chunks(f) for f in files] and peak <= 4
@@ -0,0 +1,20 @@
+from kpi_alerts import CalmAlerts
+
+class GrowingRates:
+    """Stand-in for kpi_trends.RollingRates: one series object that gains a day at a time."""
+    def __init__(self):
+        self.days, self.series = [], []
+
+    def add(self, resp):
+        self.days.append(len(self.days))
+        self.series.append({"resp": resp, "view": None, "offer": None})
+
+def test_drop_starting_at_warmup_stays_reported():
+    ca, rr = CalmAlerts(), GrowingRates()
+    out = []
+    for v in [0.05] * ca.min_obs + [0.01] * 20:     # drop begins on the first judged day
+        rr.add(v)                      # the newest day is still open, so it is consumed next time
+        out.append(ca.update("p", {ca.window: rr})["resp"])
+    on = out.index(True)
+    assert on <= ca.min_obs + ca.persist
+    assert out[on:] == [True] * (len(out) - on)
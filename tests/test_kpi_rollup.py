@@ -0,0 +1,51 @@
+import os
+from kpi_rollup import KpiStore
+
+HEADER = "date,property_id,pv,inquiries,viewings,offers\n"
+
+def _row(i, pid="P1"):
+    return f"2025-08-{i:02d},{pid},{50 + i},{i % 4},{i % 3},{i % 2}\n"
+
+def _totals(store):
+    return {pid: store.rollup_for(pid).totals() for pid in [None] + store.properties()}
+
+def _write(path, text, mtime):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+def test_unterminated_last_line_waits_for_its_newline(tmp_path):
+    p = tmp_path / "kpi.csv"
+    full = HEADER + _row(1) + _row(2)
+    _write(p, full + "2025-08-03,P1,6", 1)             # writer still mid-line
+    store = KpiStore(p).refresh()
+    assert len(store.df) == 2 and store.rollup_for(None).totals()["pv"] == 51 + 52
+    _write(p, full + _row(3), 2)
+    store.refresh()
+    assert len(store.df) == 3
+    assert _totals(store) == _totals(KpiStore(p).refresh())
+
+def test_held_back_tail_does_not_bump_the_version(tmp_path):
+    p = tmp_path / "kpi.csv"
+    _write(p, HEADER + _row(1) + "2025-08-02,P1", 1)
+    store = KpiStore(p).refresh()
+    v = store.version
+    assert store.refresh().refresh().version == v
+
+def test_incremental_refresh_equals_a_fresh_load(tmp_path):
+    p = tmp_path / "kpi.csv"
+    rows = [_row(i, pid) for i in range(1, 15) for pid in ("P1", "P2")]
+    steps = [HEADER + "".join(rows[:6]),
+             HEADER + "".join(rows[:10]),                      # append
+             HEADER + "".join(rows[:10]) + rows[10][:9],       # partial line
+             HEADER + "".join(rows[:14]),                      # partial line completed, more appended
+             HEADER + "".join(rows[:14]) + _row(2, "P3"),      # late day for a new property
+             HEADER + "".join(rows[:8]),                       # shrink
+             HEADER + "".join(rows[:8]).replace(",P1,", ",P9,", 1)]   # same-size edit
+    store = KpiStore(p)
+    for t, text in enumerate(steps, 1):
+        _write(p, text, t)
+        store.refresh()
+        fresh = KpiStore(p).refresh()
+        assert store.properties() == fresh.properties()
+        assert _totals(store) == _totals(fresh)
+        assert store.df.reset_index(drop=True).equals(fresh.df.reset_index(drop=True)), t
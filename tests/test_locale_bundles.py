@@ -0,0 +1,28 @@
+import random
+import pytest
+from locale_bundles import bundle, compile_glossary
+
+def sequential(text, glossary):
+    """Reference: replace keys longest-first, one key at a time (the pre-compiled behaviour)."""
+    for k in sorted(glossary, key=len, reverse=True):
+        text = text.replace(k, glossary[k])
+    return text
+
+@pytest.mark.parametrize("seed", range(20))
+def test_compiled_glossary_matches_sequential_replace_on_overlapping_keys(seed):
+    rng = random.Random(seed)
+    keys = {"".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(8)}
+    glossary = {k: f"<{k.upper()}>" for k in keys}       # values never re-match a key
+    rx = compile_glossary(glossary)
+    for _ in range(50):
+        text = "".join(rng.choice("abcx") for _ in range(rng.randint(0, 20)))
+        assert rx.sub(lambda m: glossary[m.group(0)], text) == sequential(text, glossary)
+
+def test_compiled_glossary_matches_sequential_replace_on_the_shipped_glossary():
+    glossary = bundle("en")["glossary"]
+    rx = compile_glossary(glossary)
+    ja = bundle("ja")
+    texts = [t for v in ja["checklists"].values() for t in v] + [t for v in ja["risks"].values() for t in v]
+    assert texts
+    for text in texts:
+        assert rx.sub(lambda m: glossary[m.group(0)], text) == sequential(text, glossary)
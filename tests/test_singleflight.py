@@ -0,0 +1,51 @@
+import threading, time
+from singleflight import CoalescedError, SingleFlight
+
+def _run(sf, n, fn):
+    """Leader + n-1 followers on one key; returns what each caller raised or got."""
+    gate, out = threading.Event(), [None] * n
+    def leader_fn():
+        gate.wait(5)
+        return fn()
+    def call(i):
+        try:
+            out[i] = sf.do(("k",), leader_fn)
+        except BaseException as e:
+            out[i] = e
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for t in threads: t.start()
+    deadline = time.monotonic() + 5
+    while sf.stats()["calls"] < n and time.monotonic() < deadline:
+        time.sleep(0.01)
+    gate.set()
+    for t in threads: t.join(5)
+    return out
+
+def test_followers_share_the_result():
+    sf = SingleFlight()
+    res = _run(sf, 5, object)
+    assert all(r is res[0] for r in res) and res[0] is not None
+    s = sf.stats()
+    assert (s["calls"], s["executions"], s["coalesced"], s["errors"]) == (5, 1, 4, 0)
+
+def test_each_caller_gets_its_own_exception_and_every_failure_counts():
+    sf = SingleFlight()
+    def boom():
+        raise ValueError("bad csv")
+    errs = _run(sf, 6, boom)
+    assert all(isinstance(e, ValueError) and e.args == ("bad csv",) for e in errs)
+    assert len({id(e) for e in errs}) == 6
+    leader = [e for e in errs if e.__cause__ is None]
+    assert len(leader) == 1 and all(e.__cause__ is leader[0] for e in errs if e is not leader[0])
+    assert sf.stats()["errors"] == 6 and sf.stats()["in_flight"] == 0
+
+def test_uncopyable_exception_reaches_followers_as_coalesced_error():
+    class Stubborn(Exception):
+        def __reduce_ex__(self, proto):
+            raise TypeError("no copies")
+    sf = SingleFlight()
+    def boom():
+        raise Stubborn("x")
+    errs = _run(sf, 3, boom)
+    assert sum(isinstance(e, Stubborn) for e in errs) == 1
+    assert sum(isinstance(e, CoalescedError) for e in errs) == 2